@@ -27,6 +27,7 @@ from generador_ideas import GeneradorIdeas
 from validadores import ValidadorMetricas, ValidadorProyectos, ErrorValidacion
 from logger_config import configurar_logging, logger_app
 from rate_limiter import limiter
+from health import verificar_salud, verificar_salud_profunda
 
 
 # Configuración
@@ -170,6 +171,8 @@ class Sistema90DHandler(BaseHTTPRequestHandler):
             self.handle_pagina_ideas()
         elif path == '/health':
             self.handle_health()
+        elif path == '/health/deep':
+            self.handle_health(profundo=True)
         elif path.startswith('/static/'):
             self.handle_static(path)
         else:
@@ -476,9 +479,9 @@ class Sistema90DHandler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(f.read())
 
-    def handle_health(self):
-        """Retorna estado de salud del sistema."""
-        salud = verificar_salud()
+    def handle_health(self, profundo: bool = False):
+        """Retorna estado de salud del sistema (profundo: integrity_check completo)."""
+        salud = verificar_salud_profunda() if profundo else verificar_salud()
         self.send_response(200 if salud["status"] == "healthy" else 500)
         self.send_header('Content-Type', 'application/json')
         self.end_headers()
@@ -501,6 +504,7 @@ class Sistema90DHandler(BaseHTTPRequestHandler):
             estado = data.get('estado', 'idea')
             
             proyecto_id = db.crear_proyecto(nombre, hipotesis, fecha_inicio, estado)
+            dashboard_data.invalidar_cache_dashboard()
             logger_app.info(f"Nuevo proyecto creado: {nombre} (ID: {proyecto_id})")
             
             self.send_response(303)
@@ -532,6 +536,7 @@ class Sistema90DHandler(BaseHTTPRequestHandler):
                 return
             
             db.crear_metrica(proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas)
+            dashboard_data.invalidar_cache_dashboard()
             logger_app.info(f"Nueva métrica registrada para proyecto {proyecto_id}")
             
             self.send_response(303)
@@ -554,6 +559,7 @@ class Sistema90DHandler(BaseHTTPRequestHandler):
                 return
             
             db.actualizar_estado_proyecto(proyecto_id, nuevo_estado)
+            dashboard_data.invalidar_cache_dashboard()
             
             # Redirect a proyecto
             self.send_response(303)
@@ -603,6 +609,8 @@ class Sistema90DHandler(BaseHTTPRequestHandler):
                 if nuevo_estado:
                     db.actualizar_estado_proyecto(proyecto_id, nuevo_estado)
 
+            dashboard_data.invalidar_cache_dashboard()
+
             # Redirect al proyecto
             self.send_response(303)
             self.send_header('Location', f'/proyecto/{proyecto_id}')
@@ -616,6 +624,7 @@ class Sistema90DHandler(BaseHTTPRequestHandler):
         try:
             # Crear nuevo ciclo
             ciclo_id = db.crear_ciclo_90d()
+            dashboard_data.invalidar_cache_dashboard()
             logger_app.info(f"Ciclo 90D iniciado manualmente (ID: {ciclo_id})")
             
             # Redirigir al dashboard
@@ -9,10 +9,61 @@ Protege contra pérdida de datos por corrupción o eliminación accidental.
 
 from pathlib import Path
 from datetime import datetime
+import heapq
 import shutil
+import sqlite3
+import tempfile
 import gzip
 import os
 
+# zstandard es opcional: ~3x más rápido que gzip a ratio similar; sin él se usa gzip
+try:
+    import zstandard as zstd
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Tamaño de bloque para copiar/comprimir backups
+BUFFER_COPIA = 1024 * 1024
+
+
+def _copiar_archivo(origen: Path, destino: Path) -> None:
+    """
+    Copia el contenido de un archivo sin metadatos y lo fuerza a disco.
+    
+    En Linux usa os.copy_file_range (la copia ocurre dentro del kernel, sin
+    pasar bytes por Python); en otros sistemas, lectura/escritura en bloques de 4 MiB.
+    """
+    binario = getattr(os, 'O_BINARY', 0)
+    fd_in = os.open(origen, os.O_RDONLY | binario)
+    try:
+        fd_out = os.open(destino, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | binario, 0o644)
+        try:
+            restante = os.fstat(fd_in).st_size
+            copy_file_range = getattr(os, 'copy_file_range', None)
+            while restante > 0:
+                if copy_file_range is not None:
+                    try:
+                        copiados = copy_file_range(fd_in, fd_out, restante)
+                    except OSError:
+                        # FS sin soporte (p. ej. entre dispositivos): seguir en espacio de usuario
+                        copy_file_range = None
+                        continue
+                else:
+                    bloque = os.read(fd_in, min(restante, 4 * BUFFER_COPIA))
+                    vista = memoryview(bloque)
+                    while vista:
+                        vista = vista[os.write(fd_out, vista):]
+                    copiados = len(bloque)
+                if copiados == 0:
+                    break
+                restante -= copiados
+            getattr(os, 'fdatasync', os.fsync)(fd_out)
+        finally:
+            os.close(fd_out)
+    finally:
+        os.close(fd_in)
+
 
 class SistemaBackup:
     """
@@ -43,7 +94,7 @@ class SistemaBackup:
         Crear backup de la base de datos con timestamp.
         
         Args:
-            comprimir: Si True, comprime con gzip (recomendado)
+            comprimir: Si True, comprime con zstd (.zst) si está instalado, si no gzip (recomendado)
         
         Returns:
             Path: Ruta del archivo de backup creado
@@ -59,17 +110,33 @@ class SistemaBackup:
         backup_name = f"sistema_{timestamp}.db"
         
         if comprimir:
-            backup_name += '.gz'
+            backup_name += '.zst' if HAS_ZSTD else '.gz'
         
         backup_path = self.backup_dir / backup_name
         
         # Crear backup
         if comprimir:
-            with open(self.db_path, 'rb') as f_in:
-                with gzip.open(backup_path, 'wb', compresslevel=6) as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+            # Snapshot consistente a un temporal (fuera del patrón sistema_*) y luego gzip
+            fd, tmp = tempfile.mkstemp(dir=self.backup_dir, prefix='.snapshot_', suffix='.db')
+            os.close(fd)
+            try:
+                self._snapshot(Path(tmp))
+                with open(tmp, 'rb') as f_in:
+                    if HAS_ZSTD:
+                        # Nivel 3 (default de zstd) usando todos los núcleos
+                        compresor = zstd.ZstdCompressor(level=3, threads=-1)
+                        with open(backup_path, 'wb') as destino:
+                            with compresor.stream_writer(destino) as f_out:
+                                shutil.copyfileobj(f_in, f_out, length=BUFFER_COPIA)
+                    else:
+                        # Nivel 1: las páginas SQLite comprimen casi igual que con nivel 6
+                        # a la mitad de CPU; buffer de 1 MiB para menos llamadas de escritura
+                        with gzip.open(backup_path, 'wb', compresslevel=1) as f_out:
+                            shutil.copyfileobj(f_in, f_out, length=BUFFER_COPIA)
+            finally:
+                os.unlink(tmp)
         else:
-            shutil.copy2(self.db_path, backup_path)
+            self._snapshot(backup_path)
         
         # Calcular tamaño
         tamaño_mb = backup_path.stat().st_size / 1024 / 1024
@@ -78,6 +145,21 @@ class SistemaBackup:
         
         return backup_path
     
+    def _snapshot(self, destino: Path) -> None:
+        """
+        Copia la DB con la API de backup online de SQLite.
+        
+        A diferencia de copiar el archivo, es consistente aunque la app esté
+        escribiendo (incluye lo pendiente en el WAL) y omite páginas libres.
+        """
+        src = sqlite3.connect(self.db_path)
+        dst = sqlite3.connect(destino)
+        try:
+            src.backup(dst, pages=1024, sleep=0.0)
+        finally:
+            dst.close()
+            src.close()
+    
     def limpiar_backups_antiguos(self, max_backups: int = 30):
         """
         Mantener solo los N backups más recientes.
@@ -86,18 +168,21 @@ class SistemaBackup:
         Args:
             max_backups: Número máximo de backups a mantener
         """
-        # Obtener todos los backups ordenados por fecha (más antiguos primero)
-        backups = sorted(self.backup_dir.glob('sistema_*.db*'))
-        
-        if len(backups) > max_backups:
-            # Eliminar los más antiguos
-            backups_a_eliminar = backups[:-max_backups]
-            
-            for backup in backups_a_eliminar:
-                backup.unlink()
-                print(f"  Eliminado backup antiguo: {backup.name}")
-            
-            print(f"[OK] Limpieza completada: {len(backups_a_eliminar)} backups eliminados")
+        backups = self._escanear_backups()
+        a_eliminar = len(backups) - max_backups
+        
+        # Caso común: dentro de la cuota, no hace falta ordenar nada
+        if a_eliminar <= 0:
+            return
+        
+        # Solo los k más antiguos (el nombre lleva el timestamp): O(n log k)
+        backups_a_eliminar = heapq.nsmallest(a_eliminar, backups, key=lambda e: e.name)
+        
+        for backup in backups_a_eliminar:
+            os.unlink(backup.path)
+            print(f"  Eliminado backup antiguo: {backup.name}")
+        
+        print(f"[OK] Limpieza completada: {len(backups_a_eliminar)} backups eliminados")
     
     def backup_automatico_si_necesario(self, intervalo_horas: int = 24):
         """
@@ -110,18 +195,18 @@ class SistemaBackup:
         Returns:
             bool: True si se creó backup, False si no era necesario
         """
-        backups = sorted(self.backup_dir.glob('sistema_*.db*'))
+        # Una sola pasada lineal: el nombre lleva el timestamp, no hace falta stat()
+        ultimo_backup = max(self._escanear_backups(), key=lambda e: e.name, default=None)
         
         # Si no hay backups, crear uno
-        if not backups:
+        if ultimo_backup is None:
             print("No hay backups previos. Creando primer backup...")
             self.crear_backup()
             return True
         
         # Verificar tiempo desde último backup
-        ultimo_backup = backups[-1]
-        tiempo_desde_ultimo = datetime.now().timestamp() - ultimo_backup.stat().st_mtime
-        horas_desde_ultimo = tiempo_desde_ultimo / 3600
+        tiempo_desde_ultimo = datetime.now() - self._fecha_backup(ultimo_backup)
+        horas_desde_ultimo = tiempo_desde_ultimo.total_seconds() / 3600
         
         # Si han pasado más de N horas, crear nuevo backup
         if horas_desde_ultimo >= intervalo_horas:
@@ -147,26 +232,61 @@ class SistemaBackup:
         """
         if not backup_path.exists():
             raise FileNotFoundError(f"Backup no encontrado: {backup_path}")
+        if backup_path.suffix == '.zst' and not HAS_ZSTD:
+            raise RuntimeError(f"{backup_path.name} requiere el paquete opcional 'zstandard' para restaurarse")
         
         # Crear backup de seguridad de la BD actual antes de restaurar
         if self.db_path.exists():
             backup_seguridad = self.db_path.with_suffix('.db.before_restore')
-            shutil.copy2(self.db_path, backup_seguridad)
+            _copiar_archivo(self.db_path, backup_seguridad)
             print(f"[OK] Backup de seguridad creado: {backup_seguridad.name}")
         
         # Restaurar
-        if backup_path.suffix == '.gz':
-            # Descomprimir
-            with gzip.open(backup_path, 'rb') as f_in:
-                with open(self.db_path, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+        if backup_path.suffix in ('.zst', '.gz'):
+            # Descomprimir y forzar a disco, igual que _copiar_archivo con la copia directa
+            with open(self.db_path, 'wb') as f_out:
+                if backup_path.suffix == '.zst':
+                    with open(backup_path, 'rb') as origen:
+                        with zstd.ZstdDecompressor().stream_reader(origen) as f_in:
+                            shutil.copyfileobj(f_in, f_out, length=BUFFER_COPIA)
+                else:
+                    with gzip.open(backup_path, 'rb') as f_in:
+                        shutil.copyfileobj(f_in, f_out, length=BUFFER_COPIA)
+                f_out.flush()
+                getattr(os, 'fdatasync', os.fsync)(f_out.fileno())
         else:
             # Copiar directamente
-            shutil.copy2(backup_path, self.db_path)
+            _copiar_archivo(backup_path, self.db_path)
         
         print(f"[OK] Base de datos restaurada desde: {backup_path.name}")
         return True
     
+    def _escanear_backups(self) -> list:
+        """
+        Entradas de backup (sistema_*.db*) en una sola pasada con os.scandir.
+        DirEntry cachea su stat(), así que no se repiten syscalls por archivo
+        dentro de una misma llamada. Cada llamada reescanea: tamaños y mtimes frescos.
+        """
+        with os.scandir(self.backup_dir) as it:
+            return [
+                e for e in it
+                if e.name.startswith('sistema_') and '.db' in e.name[len('sistema_'):]
+                and e.is_file()
+            ]
+    
+    @staticmethod
+    def _fecha_backup(entry: os.DirEntry) -> datetime:
+        """
+        Fecha de creación de un backup leída de su nombre (sistema_%Y%m%d_%H%M%S.db*).
+        Inmune a mtimes alterados por `cp -p` o restauraciones; usa mtime solo si
+        el nombre no sigue el formato.
+        """
+        inicio = len('sistema_')
+        try:
+            return datetime.strptime(entry.name[inicio:inicio + 15], '%Y%m%d_%H%M%S')
+        except ValueError:
+            return datetime.fromtimestamp(entry.stat().st_mtime)
+    
     def listar_backups(self) -> list:
         """
         Listar todos los backups disponibles con información.
@@ -174,17 +294,18 @@ class SistemaBackup:
         Returns:
             list: Lista de dicts con info de cada backup
         """
-        backups = sorted(self.backup_dir.glob('sistema_*.db*'), reverse=True)
+        # El nombre lleva el timestamp: orden por nombre = orden cronológico
+        backups = sorted(self._escanear_backups(), key=lambda e: e.name, reverse=True)
         
         resultado = []
         for backup in backups:
             stat = backup.stat()
             resultado.append({
                 'nombre': backup.name,
-                'ruta': str(backup),
+                'ruta': backup.path,
                 'tamaño_mb': stat.st_size / 1024 / 1024,
                 'fecha': datetime.fromtimestamp(stat.st_mtime),
-                'comprimido': backup.suffix == '.gz'
+                'comprimido': backup.name.endswith(('.gz', '.zst'))
             })
         
         return resultado
@@ -196,7 +317,7 @@ class SistemaBackup:
         Returns:
             dict: Estadísticas (número de backups, espacio usado, etc.)
         """
-        backups = list(self.backup_dir.glob('sistema_*.db*'))
+        backups = self._escanear_backups()
         
         if not backups:
             return {
@@ -205,15 +326,27 @@ class SistemaBackup:
                 'ultimo_backup': None
             }
         
-        espacio_total = sum(b.stat().st_size for b in backups)
-        ultimo_backup = max(backups, key=lambda b: b.stat().st_mtime)
+        # Una pasada: tamaño total y más reciente con un solo stat() (cacheado) por entrada
+        espacio_total = 0
+        ultimo_backup, ultimo_mtime = None, float('-inf')
+        for b in backups:
+            st = b.stat()
+            espacio_total += st.st_size
+            if st.st_mtime > ultimo_mtime:
+                ultimo_backup, ultimo_mtime = b, st.st_mtime
         
         return {
             'num_backups': len(backups),
             'espacio_total_mb': espacio_total / 1024 / 1024,
-            'ultimo_backup': datetime.fromtimestamp(ultimo_backup.stat().st_mtime),
+            'ultimo_backup': datetime.fromtimestamp(ultimo_mtime),
             'ultimo_backup_nombre': ultimo_backup.name
         }
+
+
+# Etiqueta del CLI según la extensión del backup
+_ETIQUETAS_SUFIJO = {'.gz': "[GZ]", '.zst': "[ZST]"}
+
+
 def ejecutar_backup_automatico():
     """Función de conveniencia para ser llamada desde app.py."""
     from database import DB_PATH
@@ -241,7 +374,7 @@ if __name__ == '__main__':
             backups = backup_sistema.listar_backups()
             print(f"\n[LISTA] Backups disponibles ({len(backups)}):\n")
             for i, b in enumerate(backups, 1):
-                comp = "[GZ]" if b['comprimido'] else "[DB]"
+                comp = _ETIQUETAS_SUFIJO.get(Path(b['nombre']).suffix, "[DB]")
                 print(f"{i}. {comp} {b['nombre']}")
                 print(f"   Tamaño: {b['tamaño_mb']:.2f} MB")
                 print(f"   Fecha: {b['fecha'].strftime('%Y-%m-%d %H:%M:%S')}")
@@ -4,16 +4,64 @@ dashboard_data.py - Lógica de recopilación de datos para el Dashboard Unificad
 Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/dashboard_data.py
 """
 
+import bisect
 import sqlite3
+import time
 from datetime import datetime, timedelta, date
-from database import DB_PATH, get_connection
+from database import DB_PATH, get_thread_connection
 from health import verificar_salud
 
+# Cache del estado del dashboard: los agregados cambian solo al escribir datos
+CACHE_TTL_SEGUNDOS = 30
+_cache = {'ts': 0.0, 'fecha': None, 'val': None}
+# Inicio del ciclo ya parseado: solo cambia al reiniciar el ciclo
+_ciclo_inicio_cache = {'raw': None, 'parsed': None}
+
+# Porcentaje que aporta cada día del ciclo (90d) y de la ventana de adherencia (30d)
+_PCT_POR_DIA_CICLO = 100 / 90
+_PCT_POR_DIA_VENTANA = 100 / 30
+
+# Fases del ciclo: _FASES[i] aplica hasta el día _UMBRAL_FASES[i] inclusive
+_UMBRAL_FASES = (14, 45, 75)
+_FASES = (
+    {'nombre': 'Exploración', 'color': 'blue', 'icono': '🔍'},
+    {'nombre': 'Experimentación', 'color': 'orange', 'icono': '🧪'},
+    {'nombre': 'Decisión', 'color': 'red', 'icono': '🎯'},
+    {'nombre': 'Consolidación', 'color': 'green', 'icono': '🚀'},
+)
+
+
+def invalidar_cache_dashboard() -> None:
+    """Descarta el estado cacheado. Llamar tras crear/modificar proyectos, métricas o ciclos."""
+    _cache['val'] = None
+
+
 def obtener_estado_sistema() -> dict:
     """
     Recopila todas las métricas del sistema para el Dashboard.
+    Cacheado CACHE_TTL_SEGUNDOS (y por día, para que el ciclo avance a medianoche).
     """
-    conn = get_connection()
+    ahora = time.monotonic()
+    hoy = date.today()
+    if (_cache['val'] is not None and _cache['fecha'] == hoy
+            and ahora - _cache['ts'] < CACHE_TTL_SEGUNDOS):
+        return _cache['val']
+    
+    estado = _calcular_estado_sistema()
+    _cache.update(ts=ahora, fecha=hoy, val=estado)
+    return estado
+
+
+def _parsear_inicio_ciclo(raw: str) -> datetime:
+    """Parsea la fecha de inicio del ciclo, reutilizando el resultado si no cambió."""
+    if raw != _ciclo_inicio_cache['raw']:
+        _ciclo_inicio_cache.update(raw=raw, parsed=datetime.fromisoformat(raw))
+    return _ciclo_inicio_cache['parsed']
+
+
+def _calcular_estado_sistema() -> dict:
+    """Ejecuta las consultas del dashboard sin pasar por la cache."""
+    conn = get_thread_connection()
     
     # 1. Ciclo 90D
     cursor = conn.execute("SELECT valor FROM config_sistema WHERE clave = 'fecha_inicio_ciclo'")
@@ -24,71 +72,55 @@ def obtener_estado_sistema() -> dict:
         conn.commit()
         fecha_val = [date.today().isoformat()]
         
-    fecha_inicio = datetime.fromisoformat(fecha_val[0])
+    fecha_inicio = _parsear_inicio_ciclo(fecha_val[0])
     dia_actual = (datetime.now() - fecha_inicio).days + 1
     dias_restantes = max(0, 90 - dia_actual)
-    progreso_pct = min(100.0, (dia_actual / 90) * 100)
+    progreso_pct = min(100.0, dia_actual * _PCT_POR_DIA_CICLO)
     
-    # Determinar fase
-    if dia_actual <= 14:
-        fase = {'nombre': 'Exploración', 'color': 'blue', 'icono': '🔍'}
-    elif dia_actual <= 45:
-        fase = {'nombre': 'Experimentación', 'color': 'orange', 'icono': '🧪'}
-    elif dia_actual <= 75:
-        fase = {'nombre': 'Decisión', 'color': 'red', 'icono': '🎯'}
-    else:
-        fase = {'nombre': 'Consolidación', 'color': 'green', 'icono': '🚀'}
+    # Determinar fase (dicts compartidos: no modificar)
+    fase = _FASES[bisect.bisect_left(_UMBRAL_FASES, dia_actual)]
     
-    # 2. Proyectos Stats
-    cursor = conn.execute("""
+    # 2-6. Agregados del dashboard en un solo round-trip a SQLite
+    agregados = conn.execute("""
         SELECT 
-            COUNT(CASE WHEN estado IN ('active', 'mvp') THEN 1 END) as activos,
-            COUNT(CASE WHEN estado = 'winner' THEN 1 END) as winners,
-            COUNT(CASE WHEN estado = 'killed' THEN 1 END) as killed,
-            COUNT(CASE WHEN estado = 'paused' THEN 1 END) as pausados
-        FROM proyectos
-    """)
-    proyectos_res = cursor.fetchone()
+            (SELECT COUNT(*) FROM proyectos WHERE estado IN ('active', 'mvp')) as activos,
+            (SELECT COUNT(*) FROM proyectos WHERE estado = 'winner') as winners,
+            (SELECT COUNT(*) FROM proyectos WHERE estado = 'killed') as killed,
+            (SELECT COUNT(*) FROM proyectos WHERE estado = 'paused') as pausados,
+            m.ingresos_totales,
+            m.horas_totales,
+            m.proyectos_con_metricas,
+            m.ultima_metrica,
+            m.dias_activos,
+            (SELECT COUNT(*) FROM rituales_completados
+             WHERE tipo = 'diario' AND fecha >= date('now', '-30 days')) as diarios,
+            (SELECT COUNT(*) FROM rituales_completados
+             WHERE tipo = 'semanal' AND fecha >= date('now', '-30 days')) as semanales
+        FROM (
+            SELECT 
+                SUM(ingresos) as ingresos_totales,
+                SUM(tiempo_horas) as horas_totales,
+                COUNT(DISTINCT proyecto_id) as proyectos_con_metricas,
+                MAX(fecha) as ultima_metrica,
+                COUNT(DISTINCT fecha) as dias_activos
+            FROM metricas
+            WHERE fecha >= date('now', '-30 days')
+        ) m
+    """).fetchone()
     
-    # 3. Métricas últimos 30 días
-    cursor = conn.execute("""
-        SELECT 
-            SUM(ingresos) as ingresos_totales,
-            SUM(tiempo_horas) as horas_totales,
-            COUNT(DISTINCT proyecto_id) as proyectos_con_metricas,
-            MAX(fecha) as ultima_metrica
-        FROM metricas
-        WHERE fecha >= date('now', '-30 days')
-    """)
-    metricas_res = cursor.fetchone()
+    proyectos_res = agregados[0:4]
+    metricas_res = agregados[4:8]
+    dias_activos = agregados['dias_activos']
+    rituales_res = agregados[9:11]
     
     ingresos_30 = metricas_res[0] or 0
     horas_30 = metricas_res[1] or 0
     roi_global_30 = (ingresos_30 / horas_30) if horas_30 > 0 else 0
+    adherencia_pct = dias_activos * _PCT_POR_DIA_VENTANA
     
-    # 4. Salud del sistema (reusando health.py)
+    # Salud del sistema (reusando health.py)
     salud_res = verificar_salud()
     
-    # 5. Adherencia (uso del sistema últimos 30 días)
-    cursor = conn.execute("""
-        SELECT COUNT(DISTINCT fecha) FROM metricas
-        WHERE fecha >= date('now', '-30 days')
-    """)
-    dias_activos = cursor.fetchone()[0]
-    adherencia_pct = (dias_activos / 30) * 100
-    
-    # 6. Rituales
-    cursor = conn.execute("""
-        SELECT 
-            COUNT(CASE WHEN tipo = 'diario' THEN 1 END) as diarios,
-            COUNT(CASE WHEN tipo = 'semanal' THEN 1 END) as semanales
-        FROM rituales_completados
-        WHERE fecha >= date('now', '-30 days')
-    """)
-    rituales_res = cursor.fetchone()
-    
-    conn.close()
-    
     return {
         'ciclo': {
             'dia_actual': dia_actual,
@@ -103,7 +135,7 @@ def obtener_estado_sistema() -> dict:
             'winners': proyectos_res[1],
             'killed': proyectos_res[2],
             'pausados': proyectos_res[3],
-            'total': sum(proyectos_res)
+            'total': proyectos_res[0] + proyectos_res[1] + proyectos_res[2] + proyectos_res[3]
         },
         'metricas_30d': {
             'ingresos_totales': round(ingresos_30, 2),
@@ -126,17 +158,21 @@ def obtener_estado_sistema() -> dict:
         'salud': salud_res
     }
 
+
+# Flags para simplificar templates calculados por SQLite, en una sola pasada
+_SQL_RESUMEN = """
+    SELECT 
+        *,
+        estado IN ('active', 'mvp', 'idea') as es_activo,
+        COALESCE(CAST(dias_desde_inicio AS INTEGER), 0) as dias_display,
+        COALESCE(NULLIF(ultima_metrica_fecha, ''), '-') as ultima_metrica_display
+    FROM v_resumen_proyectos
+"""
+
+
 def obtener_proyectos_resumen():
     """Obtiene datos de la vista v_resumen_proyectos y añade flags para UI."""
-    conn = get_connection()
-    cursor = conn.execute("SELECT * FROM v_resumen_proyectos")
-    proyectos = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    # Mismo texto SQL + conexión del hilo => sqlite3 reutiliza el statement ya compilado
+    proyectos = [dict(row) for row in get_thread_connection().execute(_SQL_RESUMEN)]
     
-    # Enriquecer datos para simplificar templates
-    for p in proyectos:
-        p['es_activo'] = p['estado'] in ['active', 'mvp', 'idea']
-        p['dias_display'] = int(p['dias_desde_inicio']) if p['dias_desde_inicio'] else 0
-        p['ultima_metrica_display'] = p['ultima_metrica_fecha'] if p['ultima_metrica_fecha'] else '-'
-        
     return proyectos
@@ -7,12 +7,16 @@ Gestión de base de datos sin ORM. Queries directas para máxima eficiencia.
 Complejidad: O(1) inserciones, O(n) consultas donde n = proyectos activos (<20 esperado)
 """
 
+import atexit
 import sqlite3
 import os
+import threading
+import weakref
 from datetime import date, datetime, timedelta
 from typing import Optional, List, Dict, Tuple
 from contextlib import contextmanager
 from logger_config import logger_db
+from patch_db import VERSION_ESQUEMA
 
 # Ruta de la base de datos
 DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'sistema.db')
@@ -21,21 +25,77 @@ DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'sistema.db')
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
 
-def get_connection() -> sqlite3.Connection:
+def get_connection(check_same_thread: bool = True) -> sqlite3.Connection:
     """Obtener conexión a SQLite con configuraciones robustas."""
-    conn = sqlite3.connect(DB_PATH)
+    # Cache de statements compilados más holgada (default 128): las conexiones por hilo
+    # repiten siempre las mismas consultas del dashboard y la guía
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread, cached_statements=256)
     conn.row_factory = sqlite3.Row
-    
+    tune_connection(conn)
+    return conn
+
+
+def tune_connection(conn: sqlite3.Connection) -> None:
+    """Aplica los PRAGMA de robustez/rendimiento a una conexión recién abierta."""
     # Robustez Fase 4
     conn.execute("PRAGMA journal_mode=WAL")      # Previene corrupción
     conn.execute("PRAGMA synchronous=NORMAL")   # Balance seguridad/velocidad en WAL
     conn.execute("PRAGMA foreign_keys = ON")     # Mantener integridad referencial
-    
-    return conn
+    conn.execute("PRAGMA temp_store=MEMORY")     # Ordenamientos/GROUP BY temporales en RAM
+    conn.execute("PRAGMA busy_timeout=5000")     # Esperar al escritor en vez de fallar con 'locked'
 
 # Alias para compatibilidad con otros módulos
 get_db = get_connection
 
+# Una conexión reutilizable por hilo para lecturas frecuentes (dashboard)
+_local = threading.local()
+# Referencias débiles: el registro no mantiene vivas las conexiones de hilos ya terminados
+_conexiones_hilo: 'weakref.WeakSet[_ConexionHilo]' = weakref.WeakSet()
+_conexiones_lock = threading.Lock()
+
+
+class _ConexionHilo:
+    """Dueño de la conexión de un hilo: la cierra cuando el hilo termina."""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def cerrar(self) -> None:
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            conn.close()
+
+    def __del__(self):
+        # threading.local libera sus datos al terminar el hilo
+        self.cerrar()
+
+
+def get_thread_connection() -> sqlite3.Connection:
+    """
+    Conexión del hilo actual, creada la primera vez y reutilizada después.
+    Evita abrir la DB y reaplicar los PRAGMA en cada request.
+    NO cerrarla: vive lo que vive el hilo.
+    """
+    holder = getattr(_local, 'holder', None)
+    if holder is None:
+        # check_same_thread=False: se cierra desde otro hilo (fin del hilo o atexit)
+        holder = _local.holder = _ConexionHilo(get_connection(check_same_thread=False))
+        with _conexiones_lock:
+            _conexiones_hilo.add(holder)
+    return holder.conn
+
+
+@atexit.register
+def cerrar_conexiones_hilo() -> None:
+    """Cierra las conexiones por hilo que sigan abiertas al terminar el proceso."""
+    with _conexiones_lock:
+        pendientes = list(_conexiones_hilo)
+        _conexiones_hilo.clear()
+    for holder in pendientes:
+        holder.cerrar()
+
 @contextmanager
 def transaccion_segura():
     """Context manager para garantizar transacciones ACID y cierre de conexión."""
@@ -50,6 +110,14 @@ def transaccion_segura():
     finally:
         conn.close()
 
+def session():
+    """
+    Una conexión para varias operaciones seguidas (p. ej. insertar y validar):
+    una sola transacción y un solo cierre/checkpoint en vez de uno por llamada.
+    Uso: with db.session() as conn: db.crear_metrica(..., conn=conn)
+    """
+    return transaccion_segura()
+
 
 def init_database() -> None:
     """
@@ -59,6 +127,12 @@ def init_database() -> None:
     conn = get_connection()
     cursor = conn.cursor()
     
+    # DB nueva: el esquema de abajo ya incluye todas las migraciones de patch_db.
+    # Una DB previa no se marca: CREATE TABLE IF NOT EXISTS no le añade columnas
+    nueva = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'proyectos'"
+    ).fetchone() is None
+    
     # Tabla de ciclos 90D
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS ciclos_90d (
@@ -183,11 +257,20 @@ def init_database() -> None:
     # Índices para optimización
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_metricas_proyecto ON metricas(proyecto_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_metricas_fecha ON metricas(fecha)")
+    # Ventanas por fecha del dashboard: COUNT(DISTINCT proyecto_id) sale solo del índice
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_metricas_fecha_proyecto ON metricas(fecha, proyecto_id)")
+    # MAX(fecha) por proyecto (guía / proyectos estancados) sin ordenar ni tocar la tabla
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_metricas_pid_fecha ON metricas(proyecto_id, fecha DESC)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_proyectos_estado ON proyectos(estado)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_decisiones_proyecto ON decisiones(proyecto_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_decisiones_fecha ON decisiones(fecha)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_alertas_proyecto ON alertas(proyecto_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_alertas_resuelta ON alertas(resuelta)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rituales_fecha_tipo ON rituales_completados(fecha, tipo)")
+    
+    if nueva:
+        # PRAGMA no admite parámetros; VERSION_ESQUEMA es un int controlado por nosotros
+        cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
     
     conn.commit()
     conn.close()
@@ -452,15 +535,42 @@ def actualizar_estado_proyecto(proyecto_id: int, nuevo_estado: str) -> bool:
 
 def crear_metrica(proyecto_id: int, fecha: str, ingresos: float = 0.0, 
                   tiempo_horas: float = 0.0, conversiones: int = 0, 
-                  notas: str = '') -> int:
-    """Registrar nueva métrica para un proyecto con atomicidad."""
-    with transaccion_segura() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO metricas (proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas))
-        return cursor.lastrowid
+                  notas: str = '', conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Registrar nueva métrica para un proyecto con atomicidad.
+    Con conn (ver session()), se inserta en esa transacción y el commit queda a cargo del llamador.
+    """
+    if conn is None:
+        with transaccion_segura() as conn:
+            return crear_metrica(proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas, conn=conn)
+    
+    cursor = conn.execute("""
+        INSERT INTO metricas (proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas))
+    return cursor.lastrowid
+
+
+def crear_metricas_bulk(filas: List[Tuple], conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Registrar varias métricas en una sola transacción (un solo commit/fsync).
+    
+    Args:
+        filas: Tuplas (proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas)
+        conn: Conexión de session() a reutilizar (None = transacción propia)
+    
+    Returns:
+        int: Número de métricas insertadas
+    """
+    if conn is None:
+        with transaccion_segura() as conn:
+            return crear_metricas_bulk(filas, conn=conn)
+    
+    cursor = conn.executemany("""
+        INSERT INTO metricas (proyecto_id, fecha, ingresos, tiempo_horas, conversiones, notas)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, filas)
+    return cursor.rowcount
 
 
 def obtener_metricas_proyecto(proyecto_id: int) -> List[Dict]:
@@ -559,26 +669,20 @@ def obtener_todos_proyectos_con_metricas() -> List[Dict]:
             COALESCE(SUM(m.tiempo_horas), 0) as total_tiempo,
             COALESCE(SUM(m.conversiones), 0) as total_conversiones,
             COUNT(m.id) as num_metricas,
-            MAX(m.fecha) as ultima_metrica
+            MAX(m.fecha) as ultima_metrica,
+            -- ROI agregado en SQLite, en la misma pasada que las sumas
+            CASE WHEN SUM(m.tiempo_horas) > 0
+                 THEN SUM(m.ingresos) * 1.0 / SUM(m.tiempo_horas)
+                 ELSE 0.0 END as roi
         FROM proyectos p
         LEFT JOIN metricas m ON p.id = m.proyecto_id
         GROUP BY p.id
         ORDER BY p.created_at DESC
     """)
     
-    rows = cursor.fetchall()
+    proyectos = [dict(row) for row in cursor]
     conn.close()
     
-    proyectos = []
-    for row in rows:
-        data = dict(row)
-        # Calcular ROI
-        if data['total_tiempo'] > 0:
-            data['roi'] = data['total_ingresos'] / data['total_tiempo']
-        else:
-            data['roi'] = 0.0
-        proyectos.append(data)
-    
     return proyectos
 
 
@@ -786,17 +890,20 @@ def detectar_proyectos_zombie(dias_inactividad: int = 4) -> List[int]:
 # VALIDACIÓN Y ANÁLISIS DE DATOS
 # ============================================================================
 
-def validar_datos_proyecto(proyecto_id: int) -> Dict:
+def validar_datos_proyecto(proyecto_id: int, conn: Optional[sqlite3.Connection] = None) -> Dict:
     """
     Validar que un proyecto tiene datos suficientes para análisis.
     
     Args:
         proyecto_id: ID del proyecto
+        conn: Conexión de session() a reutilizar (ve sus escrituras aún sin commit)
     
     Returns:
         Dict con: valido (bool), mensaje (str), datos (dict)
     """
-    conn = get_connection()
+    conexion_propia = conn is None
+    if conexion_propia:
+        conn = get_connection()
     cursor = conn.cursor()
     
     # Obtener métricas del proyecto
@@ -811,7 +918,8 @@ def validar_datos_proyecto(proyecto_id: int) -> Dict:
     """, (proyecto_id,))
     
     row = cursor.fetchone()
-    conn.close()
+    if conexion_propia:
+        conn.close()
     
     if not row:
         return {
@@ -1,10 +1,69 @@
-from gemini_integration import GeminiCLI
 from database import get_db
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime
+from functools import cached_property, lru_cache
+from typing import Optional, Tuple
 
 logger = logging.getLogger('generador_ideas')
 
+# Por debajo de este tamaño de lote el overhead del pool supera la ganancia
+UMBRAL_VALIDACION_PARALELA = 10
+
+# Campos sin los cuales la idea no sirve
+_CAMPOS_CRITICOS = frozenset(('nombre', 'descripcion', 'hipotesis'))
+
+# Valores por defecto para campos opcionales faltantes o vacíos
+_DEFAULTS_IDEA = {
+    'mercado_objetivo': 'Solopreneurs y emprendedores',
+    'dificultad': 'media',
+    'tiempo_estimado_mvp': '2-4 semanas',
+    'razon_sugerencia': 'Oportunidad de mercado detectada',
+    'puntuacion_viabilidad': 7
+}
+
+_NIVELES_DIFICULTAD = {'baja': 0, 'media': 1, 'alta': 2}
+_PALABRAS_MERCADO_ESPECIFICO = ('cto', 'ceo', 'developer', 'diseñador', 'consultor')
+
+# Plantillas de prompts (las llaves del JSON van escapadas para str.format)
+_PROMPT_IDEAS_RELACIONADAS = """GENERA UN ARRAY JSON CON EXACTAMENTE {cantidad} IDEAS SAAS.
+BASADAS EN ESTOS PROYECTOS EXISTENTES PARA CREAR UN ECOSISTEMA:
+{proyectos_desc}
+
+PARA CADA IDEA, DEBES INCLUIR OBLIGATORIAMENTE TODOS ESTOS CAMPOS:
+[
+  {{
+    "nombre": "Nombre corto y pegadizo",
+    "descripcion": "Explicación de 1 frase",
+    "hipotesis": "Si [acción], entonces [resultado esperado] porque [razón]",
+    "mercado_objetivo": "Perfil específico (ej. Dueños de agencias Shopify)",
+    "dificultad": "baja" o "media" o "alta",
+    "tiempo_estimado_mvp": "Ej. 2 semanas",
+    "razon_sugerencia": "Por qué conecta con los proyectos actuales",
+    "puntuacion_viabilidad": 1-10
+  }}
+]
+RESPONDE ÚNICAMENTE EL ARRAY JSON, SIN TEXTO ADICIONAL NI COMENTARIOS."""
+
+_PROMPT_IDEAS_NUEVAS = """GENERA UN ARRAY JSON CON EXACTAMENTE {cantidad} IDEAS SAAS PARA SOLOPRENEURS.
+
+PARA CADA IDEA, DEBES INCLUIR OBLIGATORIAMENTE TODOS ESTOS CAMPOS:
+[
+  {{
+    "nombre": "Nombre corto y pegadizo",
+    "descripcion": "Explicación de 1 frase",
+    "hipotesis": "Si [acción], entonces [resultado esperado] porque [razón]",
+    "mercado_objetivo": "Perfil específico (ej. Creadores de contenido en X)",
+    "dificultad": "baja" o "media" o "alta",
+    "tiempo_estimado_mvp": "Ej. 3 semanas",
+    "razon_sugerencia": "Por qué es una buena oportunidad ahora",
+    "puntuacion_viabilidad": 1-10
+  }}
+]
+RESPONDE ÚNICAMENTE EL ARRAY JSON, SIN TEXTO ADICIONAL NI COMENTARIOS."""
+
 class GeneradorIdeas:
     """
     Genera ideas de proyectos usando Gemini CLI.
@@ -15,7 +74,12 @@ class GeneradorIdeas:
     
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.gemini = GeminiCLI(yolo_mode=True)
+    
+    @cached_property
+    def gemini(self):
+        """Cliente Gemini CLI, construido solo cuando se necesita por primera vez."""
+        from gemini_integration import GeminiCLI
+        return GeminiCLI(yolo_mode=True)
     
     def generar_ideas(self, cantidad: int = 5) -> dict:
         """
@@ -83,39 +147,18 @@ class GeneradorIdeas:
                 'respuesta_raw': resultado['respuesta']
             }
         
-        # CORRECCIÓN: Manejar tanto array directo como objeto {ideas: [...]}
-        json_data = resultado['json']
-        
-        if isinstance(json_data, list):
-            # Gemini retornó array directo: [{idea1}, {idea2}, ...]
-            ideas = json_data
-            logger.info(f"Gemini retornó array directo con {len(ideas)} ideas")
-        elif isinstance(json_data, dict) and 'ideas' in json_data:
-            # Gemini retornó objeto: {ideas: [{idea1}, {idea2}, ...]}
-            ideas = json_data['ideas']
-            logger.info(f"Gemini retornó objeto con {len(ideas)} ideas")
-        else:
-            # Formato inesperado
-            logger.error(f"Formato JSON inesperado: {type(json_data)}")
+        ideas = self._extraer_lista_ideas(resultado['json'])
+        if ideas is None:
             return {
                 'success': False,
                 'ideas': [],
                 'contexto': tipo_contexto,
-                'error': f'Formato JSON inesperado. Recibido: {type(json_data).__name__}'
+                'error': f"Formato JSON inesperado. Recibido: {type(resultado['json']).__name__}"
             }
         
         logger.info(f"Generadas {len(ideas)} ideas exitosamente")
         
-        # Validar y enriquecer ideas
-        ideas_validadas = []
-        for i, idea in enumerate(ideas, 1):
-            if self._validar_estructura_idea(idea):
-                # Agregar puntuación de viabilidad si no existe
-                if 'puntuacion_viabilidad' not in idea:
-                    idea['puntuacion_viabilidad'] = self._calcular_viabilidad(idea)
-                ideas_validadas.append(idea)
-            else:
-                logger.warning(f"Idea {i} descartada por estructura inválida")
+        ideas_validadas = self._validar_ideas(ideas)
         
         return {
             'success': True,
@@ -124,53 +167,177 @@ class GeneradorIdeas:
             'error': None
         }
     
-    def _obtener_contexto_proyectos(self) -> dict:
-        """Obtiene información de proyectos existentes."""
-        db = get_db()
-        
-        # Proyectos activos/winners
-        cursor = db.execute("""
-            SELECT 
-                p.id,
-                p.nombre,
-                p.hipotesis,
-                p.estado,
-                COALESCE(SUM(m.ingresos), 0) as ingresos_total,
-                (julianday('now') - julianday(p.fecha_inicio)) as dias_activo
-            FROM proyectos p
-            LEFT JOIN metricas m ON m.proyecto_id = p.id
-            WHERE p.estado IN ('active', 'mvp', 'winner')
-            GROUP BY p.id
-            ORDER BY ingresos_total DESC
-            LIMIT 5
-        """)
-        
-        proyectos_activos = [
-            {
-                'nombre': row[1],
-                'hipotesis': row[2],
-                'estado': row[3],
-                'ingresos': float(row[4]),
-                'dias_activo': int(row[5])
+    async def generar_ideas_mixed(self, total: int = 6) -> dict:
+        """
+        Genera ideas relacionadas y nuevas en paralelo y las combina.
+        
+        Ambos prompts se envían a Gemini a la vez, así que la latencia total es
+        la del más lento y no la suma. Si no hay proyectos, solo se generan
+        ideas nuevas.
+        
+        Args:
+            total: Número total de ideas a generar (1-10)
+            
+        Returns:
+            Mismo formato que generar_ideas(), con contexto 'mixto'
+            (o el de generar_ideas() si no hay proyectos). Si solo una de las
+            llamadas falla, 'error' lleva su motivo aunque success sea True.
+        """
+        total = max(1, min(10, total))
+        contexto = await asyncio.to_thread(self._obtener_contexto_proyectos)
+        
+        if not contexto['tiene_proyectos'] or total < 2:
+            return await asyncio.to_thread(self.generar_ideas, total)
+        
+        # Construir el cliente una sola vez antes de lanzar las llamadas concurrentes
+        await asyncio.to_thread(getattr, self, 'gemini')
+        
+        half = total // 2
+        logger.info(f"Generando {total} ideas mixtas ({half} relacionadas, {total - half} nuevas)")
+        
+        resultados = await asyncio.gather(
+            self._call_gemini_async(self._prompt_ideas_relacionadas(contexto, half)),
+            self._call_gemini_async(self._prompt_ideas_nuevas(total - half)),
+            return_exceptions=True
+        )
+        
+        ideas = []
+        errores = []
+        for resultado in resultados:
+            if isinstance(resultado, Exception):
+                errores.append(str(resultado))
+            elif not resultado['success'] or not resultado.get('respuesta_parseada'):
+                errores.append(resultado.get('error') or 'Respuesta no es JSON válido')
+            else:
+                lista = self._extraer_lista_ideas(resultado['json'])
+                if lista is None:
+                    errores.append(f"Formato JSON inesperado. Recibido: {type(resultado['json']).__name__}")
+                else:
+                    ideas.extend(lista)
+        
+        if not ideas:
+            logger.error(f"Gemini falló generando ideas mixtas: {errores}")
+            return {
+                'success': False,
+                'ideas': [],
+                'contexto': 'mixto',
+                'error': '; '.join(errores)
             }
-            for row in cursor.fetchall()
-        ]
-        
-        # Proyectos killed (aprendizajes)
-        cursor = db.execute("""
-            SELECT nombre, razon_kill
-            FROM proyectos
-            WHERE estado = 'killed'
-              AND razon_kill IS NOT NULL
-            ORDER BY fecha_kill DESC
-            LIMIT 3
-        """)
-        
-        proyectos_killed = [
-            {'nombre': row[0], 'razon': row[1]}
-            for row in cursor.fetchall()
-        ]
+        
+        if errores:
+            logger.warning(f"Ideas mixtas parciales, falló una de las llamadas: {errores}")
+        
+        # Deduplicar por nombre (ambos prompts pueden coincidir)
+        nombres_vistos = set()
+        ideas_unicas = []
+        for idea in self._validar_ideas(ideas):
+            # El LLM puede devolver 'nombre' ausente, nulo o no textual: no abortar todo el lote
+            nombre = idea.get('nombre')
+            if not (isinstance(nombre, str) and nombre.strip()):
+                logger.warning(f"Idea con nombre inválido descartada al deduplicar: {nombre!r}")
+                continue
+            clave = nombre.strip().lower()
+            if clave not in nombres_vistos:
+                nombres_vistos.add(clave)
+                ideas_unicas.append(idea)
         
+        return {
+            'success': True,
+            'ideas': ideas_unicas,
+            'contexto': 'mixto',
+            'error': '; '.join(errores) or None
+        }
+    
+    async def _call_gemini_async(self, prompt: str) -> dict:
+        """Ejecuta un prompt en Gemini sin bloquear el event loop."""
+        return await asyncio.to_thread(self.gemini.ejecutar_con_json, prompt, 120)
+    
+    def _extraer_lista_ideas(self, json_data) -> Optional[list]:
+        """
+        Normaliza la respuesta de Gemini a una lista de ideas.
+        Acepta array directo o un objeto {ideas: [...]}. None si el formato es inesperado.
+        """
+        if isinstance(json_data, list):
+            # Gemini retornó array directo: [{idea1}, {idea2}, ...]
+            logger.info(f"Gemini retornó array directo con {len(json_data)} ideas")
+            return json_data
+        if isinstance(json_data, dict) and 'ideas' in json_data:
+            # Gemini retornó objeto: {ideas: [{idea1}, {idea2}, ...]}
+            logger.info(f"Gemini retornó objeto con {len(json_data['ideas'])} ideas")
+            return json_data['ideas']
+        
+        logger.error(f"Formato JSON inesperado: {type(json_data)}")
+        return None
+    
+    def _validar_ideas(self, ideas: list) -> list:
+        """Valida y enriquece ideas (en paralelo solo para lotes grandes)."""
+        if len(ideas) <= UMBRAL_VALIDACION_PARALELA:
+            resultados = [self._validate_and_score(idea) for idea in ideas]
+        else:
+            with ThreadPoolExecutor(max_workers=4) as ex:
+                resultados = list(ex.map(self._validate_and_score, ideas))
+        
+        ideas_validadas = []
+        for i, idea in enumerate(resultados, 1):
+            if idea is not None:
+                ideas_validadas.append(idea)
+            else:
+                logger.warning(f"Idea {i} descartada por estructura inválida")
+        return ideas_validadas
+    
+    def _open(self):
+        """
+        Abre una conexión a la DB que se cierra al salir del bloque `with`.
+        get_db() ya configura row_factory = sqlite3.Row (acceso por nombre).
+        """
+        return closing(get_db())
+    
+    def _obtener_contexto_proyectos(self) -> dict:
+        """Obtiene información de proyectos existentes."""
+        with self._open() as db:
+            # Proyectos activos/winners
+            cursor = db.execute("""
+                SELECT 
+                    p.id,
+                    p.nombre,
+                    p.hipotesis,
+                    p.estado,
+                    COALESCE(SUM(m.ingresos), 0) as ingresos_total,
+                    (julianday('now') - julianday(p.fecha_inicio)) as dias_activo
+                FROM proyectos p
+                LEFT JOIN metricas m ON m.proyecto_id = p.id
+                WHERE p.estado IN ('active', 'mvp', 'winner')
+                GROUP BY p.id
+                ORDER BY ingresos_total DESC
+                LIMIT 5
+            """)
+            
+            proyectos_activos = [
+                {
+                    'nombre': row['nombre'],
+                    'hipotesis': row['hipotesis'],
+                    'estado': row['estado'],
+                    'ingresos': float(row['ingresos_total']),
+                    'dias_activo': int(row['dias_activo'])
+                }
+                for row in cursor
+            ]
+            
+            # Proyectos killed (aprendizajes)
+            cursor = db.execute("""
+                SELECT nombre, razon_kill
+                FROM proyectos
+                WHERE estado = 'killed'
+                  AND razon_kill IS NOT NULL
+                ORDER BY fecha_kill DESC
+                LIMIT 3
+            """)
+            
+            proyectos_killed = [
+                {'nombre': row['nombre'], 'razon': row['razon_kill']}
+                for row in cursor
+            ]
+            
         return {
             'tiene_proyectos': len(proyectos_activos) > 0,
             'proyectos_activos': proyectos_activos,
@@ -185,66 +352,34 @@ class GeneradorIdeas:
             for p in contexto['proyectos_activos']
         ])
         
-        return f"""GENERA UN ARRAY JSON CON EXACTAMENTE {cantidad} IDEAS SAAS.
-BASADAS EN ESTOS PROYECTOS EXISTENTES PARA CREAR UN ECOSISTEMA:
-{proyectos_desc}
-
-PARA CADA IDEA, DEBES INCLUIR OBLIGATORIAMENTE TODOS ESTOS CAMPOS:
-[
-  {{
-    "nombre": "Nombre corto y pegadizo",
-    "descripcion": "Explicación de 1 frase",
-    "hipotesis": "Si [acción], entonces [resultado esperado] porque [razón]",
-    "mercado_objetivo": "Perfil específico (ej. Dueños de agencias Shopify)",
-    "dificultad": "baja" o "media" o "alta",
-    "tiempo_estimado_mvp": "Ej. 2 semanas",
-    "razon_sugerencia": "Por qué conecta con los proyectos actuales",
-    "puntuacion_viabilidad": 1-10
-  }}
-]
-RESPONDE ÚNICAMENTE EL ARRAY JSON, SIN TEXTO ADICIONAL NI COMENTARIOS."""
+        return _PROMPT_IDEAS_RELACIONADAS.format(cantidad=cantidad, proyectos_desc=proyectos_desc)
     
-    def _prompt_ideas_nuevas(self, cantidad: int) -> str:
+    @staticmethod
+    def _prompt_ideas_nuevas(cantidad: int) -> str:
         """Genera prompt para ideas completamente nuevas."""
-        return f"""GENERA UN ARRAY JSON CON EXACTAMENTE {cantidad} IDEAS SAAS PARA SOLOPRENEURS.
-
-PARA CADA IDEA, DEBES INCLUIR OBLIGATORIAMENTE TODOS ESTOS CAMPOS:
-[
-  {{
-    "nombre": "Nombre corto y pegadizo",
-    "descripcion": "Explicación de 1 frase",
-    "hipotesis": "Si [acción], entonces [resultado esperado] porque [razón]",
-    "mercado_objetivo": "Perfil específico (ej. Creadores de contenido en X)",
-    "dificultad": "baja" o "media" o "alta",
-    "tiempo_estimado_mvp": "Ej. 3 semanas",
-    "razon_sugerencia": "Por qué es una buena oportunidad ahora",
-    "puntuacion_viabilidad": 1-10
-  }}
-]
-RESPONDE ÚNICAMENTE EL ARRAY JSON, SIN TEXTO ADICIONAL NI COMENTARIOS."""
+        return _construir_prompt_nuevas(cantidad)
+    
+    def _validate_and_score(self, idea: dict) -> Optional[dict]:
+        """Valida una idea y le agrega puntuación de viabilidad. None si es inválida."""
+        if not self._validar_estructura_idea(idea):
+            return None
+        
+        # Agregar puntuación de viabilidad si no existe
+        if 'puntuacion_viabilidad' not in idea:
+            idea['puntuacion_viabilidad'] = self._calcular_viabilidad(idea)
+        return idea
     
     def _validar_estructura_idea(self, idea: dict) -> bool:
         """Valida que una idea tenga la estructura correcta."""
-        # Campos críticos sin los cuales la idea no sirve
-        campos_criticos = ['nombre', 'descripcion', 'hipotesis']
-        
-        # Verificar campos críticos
-        if not all(campo in idea for campo in campos_criticos):
-            campos_faltantes = [c for c in campos_criticos if c not in idea]
-            logger.warning(f"Idea '{idea.get('nombre', 'sin nombre')}' faltante campos críticos: {campos_faltantes}")
+        # Verificar campos críticos (una sola diferencia de conjuntos)
+        campos_faltantes = _CAMPOS_CRITICOS.difference(idea)
+        if campos_faltantes:
+            logger.warning(f"Idea '{idea.get('nombre', 'sin nombre')}' faltante campos críticos: {sorted(campos_faltantes)}")
             return False
             
         # Rellenar campos opcionales con valores por defecto si faltan
-        defaults = {
-            'mercado_objetivo': 'Solopreneurs y emprendedores',
-            'dificultad': 'media',
-            'tiempo_estimado_mvp': '2-4 semanas',
-            'razon_sugerencia': 'Oportunidad de mercado detectada',
-            'puntuacion_viabilidad': 7
-        }
-        
-        for campo, valor in defaults.items():
-            if campo not in idea or not idea[campo]:
+        for campo, valor in _DEFAULTS_IDEA.items():
+            if not idea.get(campo):
                 idea[campo] = valor
                 logger.debug(f"Campo '{campo}' rellenado con default para idea '{idea['nombre']}'")
         
@@ -264,44 +399,67 @@ RESPONDE ÚNICAMENTE EL ARRAY JSON, SIN TEXTO ADICIONAL NI COMENTARIOS."""
         - Especificidad del mercado (mencionado específico = +2)
         - Hipótesis clara con precio = +2
         """
-        puntuacion = 0
+        return _puntuar_viabilidad(*self._extraer_features(idea))
+    
+    def _extraer_features(self, idea: dict) -> Tuple[int, Optional[int], Optional[int], bool, bool]:
+        """
+        Reduce una idea a features enteras para el scoring.
         
-        # Factor 1: Dificultad
-        if idea['dificultad'] == 'baja':
-            puntuacion += 3
-        elif idea['dificultad'] == 'media':
-            puntuacion += 2
-        else:
-            puntuacion += 1
+        Returns:
+            (dificultad 0=baja/1=media/2=alta, días MVP, semanas MVP,
+             mercado específico, precio en hipótesis). Días/semanas son None
+            si el tiempo no está expresado en esa unidad.
+        """
+        dificultad = _NIVELES_DIFICULTAD.get(idea['dificultad'], 2)
         
-        # Factor 2: Tiempo MVP
+        dias = semanas = None
         tiempo = idea['tiempo_estimado_mvp'].lower()
         if 'día' in tiempo or 'day' in tiempo:
             dias = int(''.join(filter(str.isdigit, tiempo)) or '30')
-            if dias <= 15:
-                puntuacion += 3
-            elif dias <= 30:
-                puntuacion += 2
-            else:
-                puntuacion += 1
         elif 'semana' in tiempo or 'week' in tiempo:
             semanas = int(''.join(filter(str.isdigit, tiempo)) or '4')
-            if semanas <= 2:
-                puntuacion += 2
-            else:
-                puntuacion += 1
         
-        # Factor 3: Mercado específico
         mercado = idea['mercado_objetivo'].lower()
-        if any(palabra in mercado for palabra in ['cto', 'ceo', 'developer', 'diseñador', 'consultor']):
-            puntuacion += 2
+        mercado_especifico = any(palabra in mercado for palabra in _PALABRAS_MERCADO_ESPECIFICO)
         
-        # Factor 4: Precio en hipótesis
-        if '$' in idea['hipotesis'] or 'pagan' in idea['hipotesis'].lower():
-            puntuacion += 2
+        precio = '$' in idea['hipotesis'] or 'pagan' in idea['hipotesis'].lower()
         
-        # Normalizar a 1-10
-        return min(10, max(1, puntuacion))
+        return dificultad, dias, semanas, mercado_especifico, precio
+
+
+@lru_cache(maxsize=16)
+def _construir_prompt_nuevas(cantidad: int) -> str:
+    """El prompt de ideas nuevas solo depende de la cantidad: se construye una vez por valor."""
+    return _PROMPT_IDEAS_NUEVAS.format(cantidad=cantidad)
+
+
+def _puntuar_viabilidad(dificultad: int, dias: Optional[int], semanas: Optional[int],
+                        mercado_especifico: bool, precio: bool) -> int:
+    """Aritmética pura del scoring de viabilidad sobre features ya extraídas."""
+    # Factor 1: Dificultad
+    puntuacion = 3 - dificultad
+    
+    # Factor 2: Tiempo MVP
+    if dias is not None:
+        if dias <= 15:
+            puntuacion += 3
+        elif dias <= 30:
+            puntuacion += 2
+        else:
+            puntuacion += 1
+    elif semanas is not None:
+        puntuacion += 2 if semanas <= 2 else 1
+    
+    # Factor 3: Mercado específico
+    if mercado_especifico:
+        puntuacion += 2
+    
+    # Factor 4: Precio en hipótesis
+    if precio:
+        puntuacion += 2
+    
+    # Normalizar a 1-10
+    return min(10, max(1, puntuacion))
 
 
 # Test
@@ -1,14 +1,28 @@
 from generador_ideas import GeneradorIdeas
 import os
+import sys
 import json
 
+# orjson es opcional: serializa directo a bytes UTF-8, mucho más rápido que json
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 def main():
     db_path = os.path.join('data', 'sistema.db')
     generador = GeneradorIdeas(db_path)
     resultado = generador.generar_ideas(cantidad=3)
     
     if resultado['success']:
-        print(json.dumps(resultado['ideas'], indent=2, ensure_ascii=False))
+        if HAS_ORJSON:
+            sys.stdout.buffer.write(orjson.dumps(
+                resultado['ideas'],
+                option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+            ))
+        else:
+            print(json.dumps(resultado['ideas'], indent=2, ensure_ascii=False))
     else:
         print(f"Error: {resultado['error']}")
 
@@ -6,55 +6,68 @@ Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/guia.py
 
 from typing import Dict, List
 import random
+import re
 
 CONSEJOS = {
-    "IDEACIÓN": [
+    "IDEACIÓN": (
         "No te enamores de la solución, enamórate del problema.",
         "Habla con al menos 5 clientes potenciales antes de escribir una línea de código.",
         "Define el umbral de éxito: ¿Qué número validaría tu idea en 7 días?",
         "Si no puedes explicar tu idea en un tweet, es demasiado compleja."
-    ],
-    "MVP / VALIDACIÓN": [
+    ),
+    "MVP / VALIDACIÓN": (
         "Si no te avergüenza tu primera versión, lanzaste demasiado tarde.",
         "Mide solo lo que importa: ¿Alguien está dispuesto a pagar/suscribirse?",
         "No construyas automatizaciones hasta que lo hayas hecho 10 veces manual.",
         "El objetivo del MVP no es ganar dinero, es reducir la incertidumbre."
-    ],
-    "LANZAMIENTO / TRACCIÓN": [
+    ),
+    "LANZAMIENTO / TRACCIÓN": (
         "Céntrate en un solo canal de adquisición hasta que funcione.",
         "Pide feedback brutalmente honesto, no busques cumplidos.",
         "Observa lo que los usuarios HACEN, no lo que DICEN.",
         "La retención es más importante que la adquisición en esta etapa."
-    ],
-    "ESCALADO / CIERRE": [
+    ),
+    "ESCALADO / CIERRE": (
         "Un 'Winner' se siente diferente: la demanda supera tu capacidad.",
         "Si el ROI es bajo después de 3 pivotes, cárgalo (KILL) sin piedad.",
         "Documenta tus aprendizajes de los proyectos fallidos; son tu activo más valioso.",
         "Escalar un producto roto solo lo rompe más rápido."
-    ]
+    )
 }
 
+# Palabra clave (en mayúsculas) -> categoría de consejos. Cada alternativa es un
+# lookahead anclado: si varias aparecen, gana la categoría listada primero
+_FASE_RE = re.compile(
+    r"^(?=.*?(?P<mvp>MVP|VALIDACIÓN))"
+    r"|^(?=.*?(?P<lanz>LANZAMIENTO|TRACCIÓN))"
+    r"|^(?=.*?(?P<esc>ESCALADO|CIERRE|OPTIMIZACIÓN))",
+    re.DOTALL
+)
+_CATEGORIA_POR_GRUPO = {
+    "mvp": "MVP / VALIDACIÓN",
+    "lanz": "LANZAMIENTO / TRACCIÓN",
+    "esc": "ESCALADO / CIERRE",
+}
+
+# Estados que ya no cuentan como proyecto en curso
+_ESTADOS_MUERTOS = frozenset({'killed', 'winner'})
+
+# Generador propio del módulo (no comparte estado con el random global)
+_rng = random.Random()
+
 def obtener_consejo_por_fase(fase_nombre: str) -> str:
     """Retorna un consejo aleatorio basado en la fase actual."""
     # Mapear nombres de fase del sistema a las categorías de consejos
     fase_nombre = fase_nombre.upper()
-    categoria = "IDEACIÓN"
-    
-    if "MVP" in fase_nombre or "VALIDACIÓN" in fase_nombre:
-        categoria = "MVP / VALIDACIÓN"
-    elif "LANZAMIENTO" in fase_nombre or "TRACCIÓN" in fase_nombre:
-        categoria = "LANZAMIENTO / TRACCIÓN"
-    elif "ESCALADO" in fase_nombre or "CIERRE" in fase_nombre or "OPTIMIZACIÓN" in fase_nombre:
-        categoria = "ESCALADO / CIERRE"
-        
-    consejos = CONSEJOS.get(categoria, CONSEJOS["IDEACIÓN"])
-    return random.choice(consejos)
+    m = _FASE_RE.search(fase_nombre)
+    categoria = _CATEGORIA_POR_GRUPO[m.lastgroup] if m else "IDEACIÓN"
+    return _rng.choice(CONSEJOS[categoria])
 
 def obtener_guia_contextual(proyectos: List[Dict], fase: Dict) -> Dict:
     """
     Genera un resumen de guía basado en el estado actual del sistema.
     """
-    num_proyectos = len([p for p in proyectos if p['estado'] not in ['killed', 'winner']])
+    num_proyectos = sum(1 for p in proyectos if p['estado'] not in _ESTADOS_MUERTOS)
     consejo = obtener_consejo_por_fase(fase['nombre'])
     
     alertas_locales = []
@@ -69,16 +82,36 @@ def obtener_guia_contextual(proyectos: List[Dict], fase: Dict) -> Dict:
         "recomendaciones": alertas_locales,
         "num_activos": num_proyectos
     }
+
+
+# Siguiente acción en un solo round-trip: como mucho una fila, la de mayor prioridad
+# 1) ritual diario pendiente, 2) proyecto activo sin métricas en > 48h
+_SQL_SIGUIENTE_ACCION = """
+    SELECT 1 AS prioridad, 'ritual' AS clase, NULL AS id, NULL AS nombre
+    WHERE NOT EXISTS (
+        SELECT 1 FROM rituales_completados WHERE tipo='diario' AND date(fecha) = date('now')
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 2, 'zombie', p.id, p.nombre FROM proyectos p
+        LEFT JOIN metricas m ON p.id = m.proyecto_id
+        WHERE p.estado IN ('active', 'mvp')
+        GROUP BY p.id
+        HAVING (julianday('now') - julianday(MAX(m.fecha))) > 2 OR MAX(m.fecha) IS NULL
+        LIMIT 1
+    )
+    ORDER BY prioridad
+    LIMIT 1
+"""
+
+
 def obtener_siguiente_accion() -> dict:
     """Implementa la lógica del Cuadrante 2: ¿Qué debo hacer ahora?"""
-    from database import get_connection
-    conn = get_connection()
+    from database import get_thread_connection
+    fila = get_thread_connection().execute(_SQL_SIGUIENTE_ACCION).fetchone()
     
-    # 1. Verificar si hay ritual diario hoy
-    cursor = conn.execute("SELECT id FROM rituales_completados WHERE tipo='diario' AND date(fecha) = date('now')")
-    ritual_hoy = cursor.fetchone()
-    if not ritual_hoy:
-        conn.close()
+    # 1. No hay ritual diario hoy
+    if fila is not None and fila['clase'] == 'ritual':
         return {
             'titulo': '⏰ Ritual Diario Pendiente',
             'descripcion': 'No has registrado tus métricas de hoy. Tómate 2 minutos para mantener el pulso del sistema.',
@@ -87,28 +120,17 @@ def obtener_siguiente_accion() -> dict:
             'accion': '/ritual-diario'
         }
         
-    # 2. Verificar proyectos sin métricas recientes (> 48h)
-    cursor = conn.execute("""
-        SELECT p.id, p.nombre FROM proyectos p
-        LEFT JOIN metricas m ON p.id = m.proyecto_id
-        WHERE p.estado IN ('active', 'mvp')
-        GROUP BY p.id
-        HAVING (julianday('now') - julianday(MAX(m.fecha))) > 2 OR MAX(m.fecha) IS NULL
-        LIMIT 1
-    """)
-    proyecto_abandonado = cursor.fetchone()
-    if proyecto_abandonado:
-        conn.close()
+    # 2. Proyecto sin métricas recientes (> 48h)
+    if fila is not None:
         return {
-            'titulo': f'🧟 Proyecto "{proyecto_abandonado["nombre"]}" estancado',
+            'titulo': f'🧟 Proyecto "{fila["nombre"]}" estancado',
             'descripcion': 'Han pasado más de 48h sin datos. ¿Sigue vivo este experimento?',
             'urgencia': 'medium',
             'tiempo_estimado': '5 min',
-            'accion': f'/proyecto/{proyecto_abandonado["id"]}'
+            'accion': f'/proyecto/{fila["id"]}'
         }
         
     # 3. Acción por defecto: Exploración/Mejora
-    conn.close()
     return {
         'titulo': '🧪 Explora un nuevo canal',
         'descripcion': 'El sistema está al día. ¿Qué pequeño experimento podrías lanzar hoy para aumentar tu tracción?',
@@ -6,10 +6,61 @@ Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/health.py
 
 import sqlite3
 import os
+import time
 from pathlib import Path
 from database import DB_PATH
 
+# El resultado completo se cachea poco; el quick_check (recorre toda la DB) bastante más
+TTL_SALUD_SEGUNDOS = 5
+TTL_INTEGRIDAD_SEGUNDOS = 60
+_cache_salud = {'ts': 0.0, 'val': None}
+_cache_integridad = {'ts': 0.0, 'val': None}
+
+
 def verificar_salud() -> dict:
+    """Estado de DB y filesystem. Solo un resultado 'healthy' se cachea TTL_SALUD_SEGUNDOS."""
+    ahora = time.monotonic()
+    if _cache_salud['val'] is not None and ahora - _cache_salud['ts'] < TTL_SALUD_SEGUNDOS:
+        return _cache_salud['val']
+    
+    salud = _calcular_salud(ahora)
+    # Un fallo se recalcula en la siguiente sonda: que la recuperación se vea enseguida
+    if salud['status'] == 'healthy':
+        _cache_salud.update(ts=ahora, val=salud)
+    return salud
+
+
+def verificar_salud_profunda() -> dict:
+    """
+    PRAGMA integrity_check completo (incluye consistencia de índices). Sin cache.
+    Lento en DBs grandes: para /health/deep o cron, no para sondas frecuentes.
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            errores = [fila[0] for fila in conn.execute("PRAGMA integrity_check")]
+        finally:
+            conn.close()
+    except Exception as e:
+        return {"status": "unhealthy", "database": {"status": "error", "error": str(e)}}
+    
+    if errores == ['ok']:
+        return {"status": "healthy", "database": {"status": "ok"}}
+    return {"status": "unhealthy", "database": {"status": "corrupt", "errores": errores}}
+
+
+def _integridad_db(conn: sqlite3.Connection, ahora: float) -> str:
+    """Resultado de PRAGMA quick_check; un 'ok' se reutiliza durante TTL_INTEGRIDAD_SEGUNDOS."""
+    if _cache_integridad['val'] is not None and ahora - _cache_integridad['ts'] < TTL_INTEGRIDAD_SEGUNDOS:
+        return _cache_integridad['val']
+    # quick_check: páginas y registros, sin validar índices (mucho más barato)
+    res = conn.execute("PRAGMA quick_check").fetchone()
+    if res[0] == 'ok':
+        _cache_integridad.update(ts=ahora, val=res[0])
+    return res[0]
+
+
+def _calcular_salud(ahora: float) -> dict:
     salud = {
         "status": "healthy",
         "database": {"status": "ok"},
@@ -19,9 +70,8 @@ def verificar_salud() -> dict:
     # 1. Base de datos
     try:
         conn = sqlite3.connect(DB_PATH)
-        # Integrity check
-        res = conn.execute("PRAGMA integrity_check").fetchone()
-        if res[0] != 'ok':
+        # Quick check (cacheado)
+        if _integridad_db(conn, ahora) != 'ok':
             salud["database"]["status"] = "corrupt"
             salud["status"] = "unhealthy"
         
@@ -38,12 +88,15 @@ def verificar_salud() -> dict:
     try:
         data_dir = os.path.dirname(DB_PATH)
         dirs = ['logs', 'backups']
+        # Un solo listado del directorio en lugar de un exists() por carpeta
+        with os.scandir(data_dir) as it:
+            entradas = {e.name: e for e in it}
         for d in dirs:
-            path = os.path.join(data_dir, d)
-            if not os.path.exists(path):
+            entrada = entradas.get(d)
+            if entrada is None or not entrada.is_dir():
                 salud["filesystem"][d] = "missing"
                 salud["status"] = "degraded"
-            elif not os.access(path, os.W_OK):
+            elif not os.access(entrada.path, os.W_OK):
                 salud["filesystem"][d] = "read-only"
                 salud["status"] = "unhealthy"
     except Exception as e:
@@ -5,6 +5,7 @@ Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/integracion_i
 """
 
 import os
+import re
 import json
 from typing import Dict, Optional
 import prompt_generator as pg
@@ -22,6 +23,34 @@ try:
 except ImportError:
     HAS_OPENAI = False
 
+# orjson (opcional): parseo más rápido de respuestas JSON grandes
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Primer bloque de código Markdown (```json ... ``` o ``` ... ```)
+_CODE_BLOCK_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)```")
+
+# Decoder reutilizable: raw_decode se detiene en el primer carácter inválido
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parsear_json(texto: str):
+    """JSON al inicio de `texto`; la prosa que lo siga se ignora. Lanza JSONDecodeError."""
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(texto)
+        except orjson.JSONDecodeError:
+            pass  # Prosa tras el JSON: raw_decode sí la tolera
+    datos, _ = _JSON_DECODER.raw_decode(texto)
+    return datos
+
+# Clientes SDK ya construidos, por (proveedor, api_key). Compartidos entre instancias
+# para reutilizar el pool HTTP (keep-alive, TLS) aunque app.py cree un IntegradorIA por request
+_clientes: Dict[tuple, object] = {}
+
 
 class IntegradorIA:
     """
@@ -33,6 +62,7 @@ class IntegradorIA:
         self.api_key_anthropic = os.getenv('CLAUDE_API_KEY')
         self.api_key_openai = os.getenv('OPENAI_API_KEY')
         self.proveedor = self._detectar_proveedor()
+        self._client = None
     
     def _detectar_proveedor(self) -> str:
         """Determina qué proveedor usar basado en disponibilidad y configuración."""
@@ -42,6 +72,20 @@ class IntegradorIA:
             return 'openai'
         return 'manual'
 
+    def _obtener_cliente(self):
+        """Cliente SDK del proveedor activo, creado la primera vez y reutilizado."""
+        if self._client is None:
+            if self.proveedor == 'anthropic':
+                clave = ('anthropic', self.api_key_anthropic)
+                if clave not in _clientes:
+                    _clientes[clave] = anthropic.Anthropic(api_key=self.api_key_anthropic)
+            else:
+                clave = ('openai', self.api_key_openai)
+                if clave not in _clientes:
+                    _clientes[clave] = OpenAI(api_key=self.api_key_openai)
+            self._client = _clientes[clave]
+        return self._client
+
     def analizar_automaticamente(self) -> Dict:
         """
         Ejecuta análisis. Si hay API key y SDK, llama automáticamente.
@@ -72,7 +116,7 @@ class IntegradorIA:
 
     def _llamar_anthropic(self, prompt: str) -> Dict:
         """Llama a la API de Claude."""
-        client = anthropic.Anthropic(api_key=self.api_key_anthropic)
+        client = self._obtener_cliente()
         
         # Usamos un modelo balanceado para análisis estratégico
         response = client.messages.create(
@@ -86,7 +130,7 @@ class IntegradorIA:
 
     def _llamar_openai(self, prompt: str) -> Dict:
         """Llama a la API de OpenAI."""
-        client = OpenAI(api_key=self.api_key_openai)
+        client = self._obtener_cliente()
         
         response = client.chat.completions.create(
             model="gpt-4o",
@@ -100,24 +144,24 @@ class IntegradorIA:
     def _procesar_respuesta_ia(self, texto: str, proveedor: str) -> Dict:
         """Limpia y estructura la respuesta de la IA."""
         # Tenta extraer JSON si la IA lo envió entre bloques
-        json_limpio = texto
-        if '```json' in texto:
-            json_limpio = texto.split('```json')[1].split('```')[0].strip()
-        elif '```' in texto:
-            json_limpio = texto.split('```')[1].split('```')[0].strip()
+        m = _CODE_BLOCK_RE.search(texto)
+        json_limpio = m.group(1).strip() if m else texto.strip()
             
+        # Intentar parsear como JSON; el texto libre falla en el primer carácter
+        # y la prosa tras el JSON se ignora
         try:
-            # Intentar parsear como JSON si el formato parece JSON
-            if json_limpio.strip().startswith('{') or json_limpio.strip().startswith('['):
-                datos = json.loads(json_limpio)
-                return {
-                    'modo': 'automatico',
-                    'proveedor': proveedor,
-                    'datos': datos,
-                    'texto_completo': texto
-                }
-        except:
-            pass
+            datos = _parsear_json(json_limpio)
+        except json.JSONDecodeError:
+            datos = None
+            
+        # Solo objetos/listas cuentan como respuesta estructurada
+        if isinstance(datos, (dict, list)):
+            return {
+                'modo': 'automatico',
+                'proveedor': proveedor,
+                'datos': datos,
+                'texto_completo': texto
+            }
             
         return {
             'modo': 'automatico',
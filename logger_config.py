@@ -4,39 +4,52 @@ logger_config.py - Configuración de logging estructurado
 Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/logger_config.py
 """
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from datetime import datetime
 
+# Formato: [2025-02-03 18:10:00] [ERROR] database: Mensaje de error
+# Se crea una sola vez y lo comparten todos los handlers
+_FMT = logging.Formatter('{asctime} [{levelname}] {name}: {message}', style='{')
+
 def configurar_logging():
+    # Idempotente: llamarla dos veces no duplica handlers (ni líneas en el log)
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        return
+    
     log_dir = Path('data/logs')
     log_dir.mkdir(exist_ok=True, parents=True)
     
     log_file = log_dir / 'sistema.log'
     
-    # Formato: [2025-02-03 18:10:00] [ERROR] database: Mensaje de error
-    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
-    
     # Handler: Archivo con rotación (1MB cada uno, máximo 5 archivos)
     file_handler = RotatingFileHandler(
         log_file,
         maxBytes=1_000_000, 
         backupCount=5,
-        encoding='utf-8'
+        encoding='utf-8',
+        delay=True  # El archivo se abre con el primer registro, no al configurar
     )
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(_FMT)
     
     # Handler: Consola (solo WARNING y superior)
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(_FMT)
     console_handler.setLevel(logging.WARNING)
     
+    # La escritura a disco/consola ocurre en un hilo aparte; quien loguea solo hace put()
+    cola = queue.Queue(-1)
+    listener = QueueListener(cola, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Vacía la cola antes de salir
+    
     # Configurar root logger
-    root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(QueueHandler(cola))
 
     # Loggers específicos
     logging.getLogger('database').setLevel(logging.INFO)
@@ -4,6 +4,18 @@ import os
 
 DB_PATH = 'data/sistema.db'
 
+# Migraciones en orden: (nombre, DDL). La i-ésima (desde 1) queda registrada como
+# PRAGMA user_version = i; solo se aplican las posteriores a la versión actual
+MIGRATIONS = [
+    ("version", "ALTER TABLE proyectos ADD COLUMN version INTEGER DEFAULT 1"),
+    # Índices para la detección de proyectos estancados (JOIN + MAX(fecha) por proyecto)
+    ("idx_metricas_pid_fecha", "CREATE INDEX IF NOT EXISTS idx_metricas_pid_fecha ON metricas(proyecto_id, fecha DESC)"),
+    ("idx_proyectos_estado", "CREATE INDEX IF NOT EXISTS idx_proyectos_estado ON proyectos(estado)"),
+]
+
+# Versión de un esquema al día; init_database la asigna a las DBs que crea desde cero
+VERSION_ESQUEMA = len(MIGRATIONS)
+
 def patch_db():
     if not os.path.exists(DB_PATH):
         print("Base de datos no encontrada. Saltando parche.")
@@ -11,14 +23,28 @@ def patch_db():
 
     conn = sqlite3.connect(DB_PATH)
     try:
-        conn.execute("ALTER TABLE proyectos ADD COLUMN version INTEGER DEFAULT 1")
-        conn.commit()
-        print("✓ Columna 'version' agregada a tabla 'proyectos'.")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        pendientes = MIGRATIONS[version:]
+        if not pendientes:
+            print(f"✓ Esquema al día (versión {version}).")
+            return
+
+        # Un solo commit (y un solo fsync) para todo el lote; si algo falla, rollback completo
+        with conn:
+            conn.execute("BEGIN")
+            for nombre, sql in pendientes:
+                try:
+                    conn.execute(sql)
+                    print(f"✓ Migración '{nombre}' aplicada.")
+                except sqlite3.OperationalError as e:
+                    # DBs anteriores a user_version ya pueden tenerla
+                    if "duplicate" not in str(e).lower():
+                        raise
+                    print(f"! La migración '{nombre}' ya existe.")
+            # PRAGMA no admite parámetros; VERSION_ESQUEMA es un int controlado por nosotros
+            conn.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
     except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e).lower():
-            print("! La columna 'version' ya existe.")
-        else:
-            print(f"Error: {e}")
+        print(f"Error: {e}")
     finally:
         conn.close()
 
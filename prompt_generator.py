@@ -8,82 +8,13 @@ en su IA preferida (ChatGPT, Claude, etc.) para obtener análisis estratégico.
 """
 
 from datetime import date
+from pathlib import Path
 from typing import Dict, List
 import database as db
 
 
-def generar_prompt_analisis(formato_json: bool = False) -> str:
-    """
-    Generar prompt completo de análisis semanal del Sistema 90D.
-    
-    Args:
-        formato_json: Si es True, solicita la respuesta estrictamente en JSON.
-    
-    Returns:
-        str: Contenido markdown o estructurado para IA
-    """
-    # ... (código existente hasta la construcción del prompt) ...
-    # Obtener datos del sistema
-    ciclo = db.obtener_ciclo_activo()
-    if not ciclo:
-        return "⚠️ ERROR: No hay ciclo 90D activo. Ejecuta `python database.py` para crear uno."
-    
-    fase = db.calcular_fase_actual(ciclo)
-    proyectos = db.obtener_todos_proyectos_con_metricas()
-    
-    # NUEVO: Obtener decisiones rechazadas recientemente
-    rechazadas = db.obtener_decisiones_rechazadas_recientes(30)
-    
-    # Construir prompt
-    prompt = f"# ANÁLISIS SISTEMA 90D - {date.today().isoformat()}\n\n"
-    prompt += "## CONTEXTO DEL CICLO\n"
-    prompt += f"- Día actual: {fase['dia']}/90\n"
-    prompt += f"- Fase: {fase['nombre']}\n"
-    prompt += f"- Días restantes: {fase['dias_restantes']}\n"
-    prompt += f"- Fecha inicio ciclo: {ciclo['fecha_inicio']}\n\n" # Added this line back from original
-    
-    if rechazadas:
-        prompt += "## CONTEXTO ESTRATÉGICO: DECISIONES RECHAZADAS RECIENTEMENTE\n"
-        prompt += "IMPORTANTE: El usuario ha rechazado previamente estas sugerencias. NO vuelvas a proponer la misma decisión a menos que haya un cambio drástico en las métricas.\n\n"
-        for r in rechazadas:
-            prompt += f"- **{r['proyecto_nombre']}**: Recomendación de {r['tipo'].upper()} rechazada.\n"
-            prompt += f"  - Razón del rechazo: {r['razon_rechazo']}\n"
-            prompt += f"  - Fecha: {r['fecha']}\n"
-        prompt += "\n"
-    
-    prompt += "### Tareas sugeridas para esta fase:\n"
-    
-    for i, tarea in enumerate(fase['tareas_sugeridas'], 1):
-        prompt += f"{i}. {tarea}\n"
-    
-    prompt += "\n---\n\n## PROYECTOS REGISTRADOS\n\n"
-    
-    if not proyectos:
-        prompt += "_No hay proyectos registrados aún._\n\n"
-    else:
-        for i, p in enumerate(proyectos, 1):
-            prompt += f"### {i}. {p['nombre']}\n\n"
-            prompt += f"- **Hipótesis**: {p['hipotesis']}\n"
-            prompt += f"- **Estado**: `{p['estado']}`\n"
-            prompt += f"- **Fecha inicio**: {p['fecha_inicio']}\n"
-            prompt += f"- **Métricas consolidadas**:\n"
-            prompt += f"  - Ingresos totales: ${p['total_ingresos']:.2f}\n"
-            prompt += f"  - Tiempo invertido: {p['total_tiempo']:.1f} horas\n"
-            prompt += f"  - ROI: ${p['roi']:.2f}/hora\n"
-            prompt += f"  - Conversiones totales: {p['total_conversiones']}\n"
-            prompt += f"  - Registros de métricas: {p['num_metricas']}\n"
-            
-            if p['ultima_metrica']:
-                prompt += f"  - Última actividad: {p['ultima_metrica']}\n"
-            else:
-                prompt += f"  - ⚠️ Sin métricas registradas\n"
-            
-            prompt += "\n"
-    
-    # ... (código previo)
-    
-    if formato_json:
-        prompt += """---
+# Bloques de instrucciones estáticos (se construyen una sola vez al importar)
+_FOOTER_JSON = """---
 
 ## PROMPT PARA IA (FORMATO AUTOMÁTICO)
 
@@ -107,8 +38,8 @@ FORMATO JSON ESPERADO:
 
 IMPORTANTE: Responde ÚNICAMENTE con el objeto JSON. Sin texto antes ni después.
 """
-    else:
-        prompt += """---
+
+_FOOTER_YAML = """---
 
 ## PROMPT PARA IA
 
@@ -168,8 +99,108 @@ resumen_general:
 
 **IMPORTANTE**: Sé brutalmente honesto. El objetivo es **decidir mejor y más rápido**, no sentirse ocupado.
 """
+
+_FOOTER_PROYECTO = """---
+
+## PROMPT PARA IA
+
+Analiza este proyecto en profundidad según las reglas del Sistema 90D.
+
+### Preguntas clave a responder:
+
+1. **Validación de hipótesis**: ¿Los datos confirman o refutan la hipótesis original?
+2. **Tracción real**: ¿Hay evidencia de demanda genuina o solo curiosidad?
+3. **Tendencia**: ¿Las métricas mejoran, empeoran o están estancadas?
+4. **Eficiencia**: ¿El ROI justifica continuar invirtiendo tiempo?
+5. **Riesgos**: ¿Qué dependencias peligrosas existen?
+
+### Tu análisis debe incluir:
+
+- **Decisión**: ❌ KILL | 🔁 ITERATE | 🚀 WINNER
+- **Justificación**: Basada en datos específicos del historial
+- **Acciones concretas**: Qué hacer en los próximos 7 días
+- **Métricas a vigilar**: Qué medir para la próxima decisión
+- **Umbral de decisión**: Qué número/evento dispararía kill o scale
+
+**Formato esperado**: Respuesta estructurada en YAML o JSON.
+"""
+
+
+def generar_prompt_analisis(formato_json: bool = False) -> str:
+    """
+    Generar prompt completo de análisis semanal del Sistema 90D.
+    
+    Args:
+        formato_json: Si es True, solicita la respuesta estrictamente en JSON.
+    
+    Returns:
+        str: Contenido markdown o estructurado para IA
+    """
+    # Obtener datos del sistema
+    ciclo = db.obtener_ciclo_activo()
+    if not ciclo:
+        return "⚠️ ERROR: No hay ciclo 90D activo. Ejecuta `python database.py` para crear uno."
+    
+    fase = db.calcular_fase_actual(ciclo)
+    proyectos = db.obtener_todos_proyectos_con_metricas()
+    
+    # NUEVO: Obtener decisiones rechazadas recientemente
+    rechazadas = db.obtener_decisiones_rechazadas_recientes(30)
+    
+    # Construir prompt (un append por línea, un solo join al final)
+    parts: List[str] = [
+        f"# ANÁLISIS SISTEMA 90D - {date.today().isoformat()}\n\n",
+        "## CONTEXTO DEL CICLO\n",
+        f"- Día actual: {fase['dia']}/90\n",
+        f"- Fase: {fase['nombre']}\n",
+        f"- Días restantes: {fase['dias_restantes']}\n",
+        f"- Fecha inicio ciclo: {ciclo['fecha_inicio']}\n\n",
+    ]
     
-    return prompt
+    if rechazadas:
+        parts.append("## CONTEXTO ESTRATÉGICO: DECISIONES RECHAZADAS RECIENTEMENTE\n")
+        parts.append("IMPORTANTE: El usuario ha rechazado previamente estas sugerencias. NO vuelvas a proponer la misma decisión a menos que haya un cambio drástico en las métricas.\n\n")
+        for r in rechazadas:
+            parts.append(
+                f"- **{r['proyecto_nombre']}**: Recomendación de {r['tipo'].upper()} rechazada.\n"
+                f"  - Razón del rechazo: {r['razon_rechazo']}\n"
+                f"  - Fecha: {r['fecha']}\n"
+            )
+        parts.append("\n")
+    
+    parts.append("### Tareas sugeridas para esta fase:\n")
+    
+    for i, tarea in enumerate(fase['tareas_sugeridas'], 1):
+        parts.append(f"{i}. {tarea}\n")
+    
+    parts.append("\n---\n\n## PROYECTOS REGISTRADOS\n\n")
+    
+    if not proyectos:
+        parts.append("_No hay proyectos registrados aún._\n\n")
+    else:
+        for i, p in enumerate(proyectos, 1):
+            if p['ultima_metrica']:
+                actividad = f"  - Última actividad: {p['ultima_metrica']}\n"
+            else:
+                actividad = "  - ⚠️ Sin métricas registradas\n"
+            
+            parts.append(
+                f"### {i}. {p['nombre']}\n\n"
+                f"- **Hipótesis**: {p['hipotesis']}\n"
+                f"- **Estado**: `{p['estado']}`\n"
+                f"- **Fecha inicio**: {p['fecha_inicio']}\n"
+                f"- **Métricas consolidadas**:\n"
+                f"  - Ingresos totales: ${p['total_ingresos']:.2f}\n"
+                f"  - Tiempo invertido: {p['total_tiempo']:.1f} horas\n"
+                f"  - ROI: ${p['roi']:.2f}/hora\n"
+                f"  - Conversiones totales: {p['total_conversiones']}\n"
+                f"  - Registros de métricas: {p['num_metricas']}\n"
+                f"{actividad}\n"
+            )
+    
+    parts.append(_FOOTER_JSON if formato_json else _FOOTER_YAML)
+    
+    return "".join(parts)
 
 
 def guardar_prompt_archivo(contenido: str, ruta: str = None) -> str:
@@ -187,8 +218,8 @@ def guardar_prompt_archivo(contenido: str, ruta: str = None) -> str:
         fecha = date.today().isoformat()
         ruta = f"data/analisis_{fecha}.md"
     
-    with open(ruta, 'w', encoding='utf-8') as f:
-        f.write(contenido)
+    # Un solo encode + write binario (sin TextIOWrapper ni traducción de saltos de línea)
+    Path(ruta).write_bytes(contenido.encode('utf-8'))
     
     return ruta
 
@@ -211,7 +242,7 @@ def generar_prompt_proyecto_individual(proyecto_id: int) -> str:
     metricas = db.obtener_metricas_proyecto(proyecto_id)
     dashboard = db.calcular_dashboard_proyecto(proyecto_id)
     
-    prompt = f"""# ANÁLISIS PROFUNDO: {proyecto['nombre']}
+    parts: List[str] = [f"""# ANÁLISIS PROFUNDO: {proyecto['nombre']}
 
 ## INFORMACIÓN DEL PROYECTO
 
@@ -229,46 +260,23 @@ def generar_prompt_proyecto_individual(proyecto_id: int) -> str:
 
 ## HISTORIAL DE MÉTRICAS
 
-"""
+"""]
     
     if not metricas:
-        prompt += "_No hay métricas registradas para este proyecto._\n\n"
+        parts.append("_No hay métricas registradas para este proyecto._\n\n")
     else:
-        prompt += "| Fecha | Ingresos | Tiempo (h) | Conversiones | Notas |\n"
-        prompt += "|-------|----------|------------|--------------|-------|\n"
+        parts.append("| Fecha | Ingresos | Tiempo (h) | Conversiones | Notas |\n")
+        parts.append("|-------|----------|------------|--------------|-------|\n")
         
         for m in metricas:
             notas = m['notas'] if m['notas'] else '-'
-            prompt += f"| {m['fecha']} | ${m['ingresos']:.2f} | {m['tiempo_horas']:.1f} | {m['conversiones']} | {notas} |\n"
+            parts.append(f"| {m['fecha']} | ${m['ingresos']:.2f} | {m['tiempo_horas']:.1f} | {m['conversiones']} | {notas} |\n")
         
-        prompt += "\n"
+        parts.append("\n")
     
-    prompt += """---
-
-## PROMPT PARA IA
-
-Analiza este proyecto en profundidad según las reglas del Sistema 90D.
-
-### Preguntas clave a responder:
-
-1. **Validación de hipótesis**: ¿Los datos confirman o refutan la hipótesis original?
-2. **Tracción real**: ¿Hay evidencia de demanda genuina o solo curiosidad?
-3. **Tendencia**: ¿Las métricas mejoran, empeoran o están estancadas?
-4. **Eficiencia**: ¿El ROI justifica continuar invirtiendo tiempo?
-5. **Riesgos**: ¿Qué dependencias peligrosas existen?
-
-### Tu análisis debe incluir:
-
-- **Decisión**: ❌ KILL | 🔁 ITERATE | 🚀 WINNER
-- **Justificación**: Basada en datos específicos del historial
-- **Acciones concretas**: Qué hacer en los próximos 7 días
-- **Métricas a vigilar**: Qué medir para la próxima decisión
-- **Umbral de decisión**: Qué número/evento dispararía kill o scale
-
-**Formato esperado**: Respuesta estructurada en YAML o JSON.
-"""
+    parts.append(_FOOTER_PROYECTO)
     
-    return prompt
+    return "".join(parts)
 
 
 if __name__ == '__main__':
@@ -4,31 +4,41 @@ rate_limiter.py - Rate limiting en memoria para el Sistema 90D
 Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/rate_limiter.py
 """
 
-from collections import defaultdict
-from time import time
+import threading
+from time import monotonic
+from typing import Dict, Tuple
+
+# Número de locks (potencia de 2): acciones distintas rara vez comparten lock
+_NUM_LOCKS = 16
 
 class RateLimiter:
-    """Implementación simple de Bucket/Ventana para un solo usuario."""
+    """Token bucket simple para un solo usuario."""
     
     def __init__(self):
-        # {key: [timestamps]}
-        self.historial = defaultdict(list)
+        # {key: (tokens disponibles, instante de la última recarga)}
+        self.state: Dict[str, Tuple[float, float]] = {}
+        self._locks = [threading.Lock() for _ in range(_NUM_LOCKS)]
     
     def permitir(self, accion: str, limite: int = 10, ventana: int = 60) -> bool:
         """
         Verifica si la acción está permitida bajo el límite.
-        Por defecto: 10 acciones por minuto.
+        Por defecto: 10 acciones por minuto (ráfaga máxima = limite,
+        recarga continua de limite/ventana tokens por segundo).
         """
-        ahora = time()
-        
-        # Limpiar antiguos
-        self.historial[accion] = [t for t in self.historial[accion] if ahora - t < ventana]
-        
-        if len(self.historial[accion]) >= limite:
-            return False
+        # Lock por franja de claves: serializa solo las peticiones de la misma acción
+        with self._locks[hash(accion) & (_NUM_LOCKS - 1)]:
+            ahora = monotonic()
+            tokens, ultimo = self.state.get(accion, (limite, ahora))
+            
+            # Recargar según el tiempo transcurrido, sin superar la capacidad
+            tokens = min(limite, tokens + (ahora - ultimo) * limite / ventana)
             
-        self.historial[accion].append(ahora)
-        return True
+            if tokens < 1:
+                self.state[accion] = (tokens, ahora)
+                return False
+                
+            self.state[accion] = (tokens - 1, ahora)
+            return True
 
 # Instancia global
 limiter = RateLimiter()
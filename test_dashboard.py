@@ -8,11 +8,17 @@ import dashboard_data
 import database as db
 import guia
 import os
+from functools import lru_cache
+
+@lru_cache(maxsize=1)
+def _estado():
+    """Estado del dashboard, calculado una vez y compartido por los tests del módulo."""
+    db.init_database()
+    return dashboard_data.obtener_estado_sistema()
 
 def test_data_collection():
     print("TEST: Recopilación de datos del dashboard...")
-    db.init_database()
-    estado = dashboard_data.obtener_estado_sistema()
+    estado = _estado()
     print(f"Fase detectada: {estado['fase']['nombre']}")
     assert 'ciclo' in estado
     assert 'fase' in estado
@@ -22,7 +28,7 @@ def test_data_collection():
 def test_render():
     print("TEST: Renderizado del dashboard...")
     # Mock context
-    estado = dashboard_data.obtener_estado_sistema()
+    estado = _estado()
     proyectos = dashboard_data.obtener_proyectos_resumen()
     siguiente = guia.obtener_siguiente_accion()
     alertas = db.obtener_todas_alertas_activas()
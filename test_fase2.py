@@ -6,6 +6,9 @@ Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/test_fase2.py
 
 import database as db
 from integracion_ia import IntegradorIA
+from generador_ideas import GeneradorIdeas
+import asyncio
+import threading
 import os
 
 def test_alertas_sistema():
@@ -53,6 +56,56 @@ def test_alertas_sistema():
     assert len(alertas_finales) == 0
     print("✓ Todas las alertas resueltas tras validación exitosa.")
 
+class _GeminiFalso:
+    """Sustituto de GeminiCLI: respuestas fijas; exige que ambas llamadas estén en vuelo a la vez."""
+    
+    def __init__(self, respuestas):
+        self.respuestas = list(respuestas)
+        self.barrera = threading.Barrier(len(respuestas), timeout=5)
+        self.lock = threading.Lock()
+    
+    def ejecutar_con_json(self, prompt, timeout):
+        self.barrera.wait()  # BrokenBarrierError si las llamadas fueran secuenciales
+        with self.lock:
+            return self.respuestas.pop(0)
+
+def _ok(*nombres):
+    return {'success': True, 'respuesta_parseada': True, 'error': None,
+            'json': [{'nombre': n, 'descripcion': 'd', 'hipotesis': 'h'} for n in nombres]}
+
+def test_generar_ideas_mixed():
+    print("\n" + "="*80)
+    print("TEST: Generación de ideas mixtas (Gemini simulado)")
+    print("="*80)
+
+    db.init_database()
+    db.crear_proyecto("Proyecto Ideas", "Testear ideas mixtas", "2026-02-01", "mvp")
+    
+    # 1. Ambas llamadas concurrentes: se combinan y deduplican (nombres repetidos o nulos)
+    gen = GeneradorIdeas(db.DB_PATH)
+    gen.gemini = _GeminiFalso([_ok("Alfa", "Beta", None), _ok(" alfa ", "Gamma", 42)])
+    res = asyncio.run(gen.generar_ideas_mixed(4))
+    assert res['success'] and res['contexto'] == 'mixto' and res['error'] is None
+    assert sorted(i['nombre'].strip().lower() for i in res['ideas']) == ["alfa", "beta", "gamma"]
+    print("✓ Ideas de ambas llamadas combinadas, duplicados y nombres nulos descartados.")
+    
+    # 2. Falla una llamada: se devuelven las ideas de la otra y el error no se pierde
+    gen = GeneradorIdeas(db.DB_PATH)
+    fallo = {'success': False, 'respuesta_parseada': False, 'error': "timeout simulado"}
+    gen.gemini = _GeminiFalso([fallo, _ok("Delta")])
+    res = asyncio.run(gen.generar_ideas_mixed(4))
+    assert res['success']
+    assert [i['nombre'] for i in res['ideas']] == ["Delta"]
+    assert "timeout simulado" in res['error']
+    print("✓ Fallo parcial reportado en 'error' conservando las ideas válidas.")
+    
+    # 3. Fallan ambas: success False
+    gen = GeneradorIdeas(db.DB_PATH)
+    gen.gemini = _GeminiFalso([fallo, fallo])
+    res = asyncio.run(gen.generar_ideas_mixed(4))
+    assert not res['success'] and res['ideas'] == []
+    print("✓ Fallo total reportado.")
+
 def test_integracion_ia_mock():
     print("\n" + "="*80)
     print("TEST: Integración IA (Modo Manual/Mock)")
@@ -69,10 +122,18 @@ def test_integracion_ia_mock():
         assert 'prompt' in resultado
         print("✓ Modo manual correcto: ofrece el prompt para copiar/pegar.")
     
+    # JSON seguido de prosa: se parsea el JSON y se ignora el resto
+    res = ia._procesar_respuesta_ia('{"a": 1}\n\nEspero que ayude.', 'mock')
+    assert res['datos'] == {'a': 1}
+    res = ia._procesar_respuesta_ia('Claro, aquí va mi análisis.', 'mock')
+    assert 'datos' not in res
+    print("✓ Respuesta con prosa tras el JSON parseada correctamente.")
+    
     print("\n" + "="*80)
     print("✅ TEST DE FASE 2 COMPLETADO")
     print("="*80)
 
 if __name__ == '__main__':
     test_alertas_sistema()
+    test_generar_ideas_mixed()
     test_integracion_ia_mock()
@@ -12,8 +12,14 @@ import database as db
 import backup as bk
 from datetime import date, timedelta
 
+def _fechas_iso(*dias):
+    """Fechas ISO de hoy menos n días, calculadas una sola vez por test."""
+    hoy = date.today()
+    return {n: (hoy - timedelta(days=n)).isoformat() for n in dias}
+
 def test_validacion_datos():
     """Probar validación de datos en proyectos"""
+    ISO = _fechas_iso(0, 1, 2, 3)
     print("\n" + "="*80)
     print("TEST 1: Validación de Datos")
     print("="*80)
@@ -22,48 +28,52 @@ def test_validacion_datos():
     proyecto_id = db.crear_proyecto(
         "Proyecto Test Validación",
         "Hipótesis de prueba",
-        date.today().isoformat(),
+        ISO[0],
         "mvp"
     )
     print(f"\n✓ Proyecto creado: ID {proyecto_id}")
     
-    # Test 1: Sin métricas
-    print("\n1. Validando proyecto SIN métricas...")
-    validacion = db.validar_datos_proyecto(proyecto_id)
-    print(f"   Válido: {validacion['valido']}")
-    print(f"   Mensaje: {validacion['mensaje']}")
-    assert not validacion['valido'], "Debería ser inválido sin métricas"
-    assert validacion['tipo'] == 'datos_insuficientes'
-    print("   ✓ PASS: Detecta datos insuficientes")
-    
-    # Test 2: Con 1 métrica (insuficiente)
-    print("\n2. Agregando 1 métrica SIN tiempo...")
-    db.crear_metrica(proyecto_id, date.today().isoformat(), 100, 0, 1, "Primera métrica sin tiempo")
-    validacion = db.validar_datos_proyecto(proyecto_id)
-    print(f"   Válido: {validacion['valido']}")
-    print(f"   Mensaje: {validacion['mensaje']}")
-    assert not validacion['valido'], "Debería ser inválido con solo 1 métrica"
-    print("   ✓ PASS: Requiere mínimo 3 métricas")
-    
-    # Test 3: Con 3 métricas pero sin tiempo
-    print("\n3. Agregando 2 métricas más SIN tiempo...")
-    db.crear_metrica(proyecto_id, (date.today() - timedelta(days=1)).isoformat(), 50, 0, 0, "Sin tiempo")
-    db.crear_metrica(proyecto_id, (date.today() - timedelta(days=2)).isoformat(), 75, 0, 1, "Sin tiempo")
-    validacion = db.validar_datos_proyecto(proyecto_id)
-    print(f"   Válido: {validacion['valido']}")
-    print(f"   Mensaje: {validacion['mensaje']}")
-    assert not validacion['valido'], "Debería ser inválido sin tiempo registrado"
-    assert validacion['tipo'] == 'sin_tiempo_registrado'
-    print("   ✓ PASS: Detecta falta de tiempo registrado")
-    
-    # Test 4: Con datos completos
-    print("\n4. Agregando métrica CON tiempo...")
-    db.crear_metrica(proyecto_id, (date.today() - timedelta(days=3)).isoformat(), 200, 5, 2, "Con tiempo")
-    validacion = db.validar_datos_proyecto(proyecto_id)
-    print(f"   Válido: {validacion['valido']}")
-    print(f"   Mensaje: {validacion['mensaje']}")
-    assert validacion['valido'], "Debería ser válido con 4 métricas y tiempo"
-    print("   ✓ PASS: Datos válidos para análisis")
+    # Tests 1-4 (insertar + validar) sobre una sola conexión/transacción
+    with db.session() as conn:
+        # Test 1: Sin métricas
+        print("\n1. Validando proyecto SIN métricas...")
+        validacion = db.validar_datos_proyecto(proyecto_id, conn=conn)
+        print(f"   Válido: {validacion['valido']}")
+        print(f"   Mensaje: {validacion['mensaje']}")
+        assert not validacion['valido'], "Debería ser inválido sin métricas"
+        assert validacion['tipo'] == 'datos_insuficientes'
+        print("   ✓ PASS: Detecta datos insuficientes")
+        
+        # Test 2: Con 1 métrica (insuficiente)
+        print("\n2. Agregando 1 métrica SIN tiempo...")
+        db.crear_metrica(proyecto_id, ISO[0], 100, 0, 1, "Primera métrica sin tiempo", conn=conn)
+        validacion = db.validar_datos_proyecto(proyecto_id, conn=conn)
+        print(f"   Válido: {validacion['valido']}")
+        print(f"   Mensaje: {validacion['mensaje']}")
+        assert not validacion['valido'], "Debería ser inválido con solo 1 métrica"
+        print("   ✓ PASS: Requiere mínimo 3 métricas")
+        
+        # Test 3: Con 3 métricas pero sin tiempo
+        print("\n3. Agregando 2 métricas más SIN tiempo...")
+        db.crear_metricas_bulk([
+            (proyecto_id, ISO[1], 50, 0, 0, "Sin tiempo"),
+            (proyecto_id, ISO[2], 75, 0, 1, "Sin tiempo"),
+        ], conn=conn)
+        validacion = db.validar_datos_proyecto(proyecto_id, conn=conn)
+        print(f"   Válido: {validacion['valido']}")
+        print(f"   Mensaje: {validacion['mensaje']}")
+        assert not validacion['valido'], "Debería ser inválido sin tiempo registrado"
+        assert validacion['tipo'] == 'sin_tiempo_registrado'
+        print("   ✓ PASS: Detecta falta de tiempo registrado")
+        
+        # Test 4: Con datos completos
+        print("\n4. Agregando métrica CON tiempo...")
+        db.crear_metrica(proyecto_id, ISO[3], 200, 5, 2, "Con tiempo", conn=conn)
+        validacion = db.validar_datos_proyecto(proyecto_id, conn=conn)
+        print(f"   Válido: {validacion['valido']}")
+        print(f"   Mensaje: {validacion['mensaje']}")
+        assert validacion['valido'], "Debería ser válido con 4 métricas y tiempo"
+        print("   ✓ PASS: Datos válidos para análisis")
     
     # Test 5: Análisis con validación
     print("\n5. Probando análisis con validación...")
@@ -144,6 +154,7 @@ def test_sistema_backup():
 
 def test_integracion():
     """Probar integración de mejoras"""
+    ISO = _fechas_iso(0, 3, 5, 7, 10)
     print("\n" + "="*80)
     print("TEST 3: Integración de Mejoras")
     print("="*80)
@@ -153,7 +164,7 @@ def test_integracion():
     proyecto_id = db.crear_proyecto(
         "Proyecto Integración",
         "Validar integración de mejoras",
-        (date.today() - timedelta(days=10)).isoformat(),
+        ISO[10],
         "idea"
     )
     
@@ -165,21 +176,21 @@ def test_integracion():
     
     # Día 3: Primera métrica
     print("\n   Día 3: Primera métrica registrada")
-    db.crear_metrica(proyecto_id, (date.today() - timedelta(days=7)).isoformat(), 0, 1, 0, "Investigación")
+    db.crear_metrica(proyecto_id, ISO[7], 0, 1, 0, "Investigación")
     analisis = db.analizar_proyecto_con_validacion(proyecto_id)
     print(f"   Estado: {analisis['estado']} - {analisis['mensaje']}")
     assert analisis['estado'] == 'advertencia'
     
     # Día 5: Segunda métrica
     print("\n   Día 5: Segunda métrica")
-    db.crear_metrica(proyecto_id, (date.today() - timedelta(days=5)).isoformat(), 0, 2, 0, "Prototipo")
+    db.crear_metrica(proyecto_id, ISO[5], 0, 2, 0, "Prototipo")
     analisis = db.analizar_proyecto_con_validacion(proyecto_id)
     print(f"   Estado: {analisis['estado']} - {analisis['mensaje']}")
     assert analisis['estado'] == 'advertencia'
     
     # Día 7: Tercera métrica (ahora sí analizable)
     print("\n   Día 7: Tercera métrica - ¡Datos suficientes!")
-    db.crear_metrica(proyecto_id, (date.today() - timedelta(days=3)).isoformat(), 50, 3, 1, "Primera venta")
+    db.crear_metrica(proyecto_id, ISO[3], 50, 3, 1, "Primera venta")
     analisis = db.analizar_proyecto_con_validacion(proyecto_id)
     print(f"   Estado: {analisis['estado']}")
     print(f"   Clasificación: {analisis['clasificacion']}")
@@ -188,7 +199,7 @@ def test_integracion():
     
     # Día 10: Más tracción
     print("\n   Día 10: Más tracción")
-    db.crear_metrica(proyecto_id, date.today().isoformat(), 200, 4, 3, "Crecimiento")
+    db.crear_metrica(proyecto_id, ISO[0], 200, 4, 3, "Crecimiento")
     analisis = db.analizar_proyecto_con_validacion(proyecto_id)
     print(f"   ROI actualizado: ${analisis['roi']:.2f}/h")
     print(f"   Decisión: {analisis['decision_sugerida']}")
@@ -5,11 +5,14 @@ Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/test_robustez
 """
 
 import database as db
+import validadores
 from validadores import ValidadorMetricas, ErrorValidacion
 from rate_limiter import limiter
+import health
 from health import verificar_salud
 import os
 import time
+from datetime import datetime, timedelta
 
 def test_transacciones_acid():
     print("\n" + "="*80)
@@ -66,6 +69,37 @@ def test_validadores():
         assert False, "Debería haber fallado"
     except ErrorValidacion:
         print("✓ Capturó error: fecha futura.")
+    
+    # 4. Formatos de fecha: separador 'T' o espacio; sin zona horaria ni formato compacto
+    for valida in ("2026-01-15", "2026-01-15T10:30", "2026-01-15 10:30",
+                   "2026-01-15T10:30:45", "2026-01-15 10:30:45.123456"):
+        assert ValidadorMetricas.validar_fecha(valida) == valida
+    for invalida in ("20260115", "2026-01-15T10:30:00+02:00", "2026-01-15T10:30:00Z",
+                     "2026-02-30", "15/01/2026", "2026-01-15 ", "2026-1-5"):
+        try:
+            ValidadorMetricas.validar_fecha(invalida)
+            assert False, f"Debería haber fallado: {invalida!r}"
+        except ErrorValidacion:
+            pass
+    print("✓ Formatos de fecha aceptados/rechazados correctamente.")
+    
+    # 5. Límite del futuro (ahora + 1h, comparado como string ISO)
+    validadores._limite_futuro.update(ts=float('-inf'))  # Recalcular el límite ahora
+    ahora = datetime.now()
+    for delta, aceptada in ((timedelta(minutes=50), True), (timedelta(minutes=70), False)):
+        momento = ahora + delta
+        for valor in (momento.isoformat(timespec='seconds'), momento.isoformat(sep=' ', timespec='seconds')):
+            try:
+                ValidadorMetricas.validar_fecha(valor)
+                assert aceptada, f"Debería haber fallado: {valor!r}"
+            except ErrorValidacion:
+                assert not aceptada, f"Debería haberse aceptado: {valor!r}"
+    try:
+        ValidadorMetricas.validar_fecha((ahora + timedelta(days=2)).date().isoformat())
+        assert False, "Debería haber fallado"
+    except ErrorValidacion:
+        pass
+    print("✓ Límite de fecha futura respetado con ambos separadores.")
 
 def test_rate_limiting():
     print("\n" + "="*80)
@@ -92,6 +126,28 @@ def test_health_check():
     assert salud['status'] in ['healthy', 'degraded']
     print(f"Detalles DB: {salud['database']}")
     print("✓ Health check generado correctamente.")
+    
+    # Un fallo no se cachea: al recuperarse la DB la siguiente sonda ya lo refleja
+    health._cache_salud.update(val=None)
+    health._cache_integridad.update(val=None)
+    ruta_original = health.DB_PATH
+    health.DB_PATH = os.path.join(ruta_original, 'no_existe', 'sistema.db')
+    try:
+        assert verificar_salud()['status'] == 'unhealthy'
+    finally:
+        health.DB_PATH = ruta_original
+    assert verificar_salud()['status'] != 'unhealthy'
+    
+    class _ConnCorrupta:
+        def execute(self, sql):
+            class _Cursor:
+                def fetchone(self):
+                    return ('*** in database main ***',)
+            return _Cursor()
+    health._cache_integridad.update(val=None)
+    assert health._integridad_db(_ConnCorrupta(), time.monotonic()) != 'ok'
+    assert health._cache_integridad['val'] is None
+    print("✓ Resultados fallidos no se cachean.")
 
 if __name__ == '__main__':
     test_transacciones_acid()
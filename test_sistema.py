@@ -11,22 +11,28 @@ def crear_datos_prueba():
     """Crear datos de prueba para demostración"""
     print("Creando datos de prueba...\n")
     
+    # Fechas ISO relativas a hoy, calculadas una sola vez
+    hoy = date.today()
+    ISO = {n: (hoy - timedelta(days=n)).isoformat() for n in (0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50)}
+    
     # Proyecto 1: Winner potencial
     print("1. Creando proyecto 'SaaS Facturación'...")
     p1 = db.crear_proyecto(
         nombre="SaaS Facturación",
         hipotesis="Freelancers necesitan herramienta simple de facturación",
-        fecha_inicio=(date.today() - timedelta(days=30)).isoformat(),
+        fecha_inicio=ISO[30],
         estado="active"
     )
     
     # Métricas del proyecto 1 (tendencia positiva)
-    db.crear_metrica(p1, (date.today() - timedelta(days=25)).isoformat(), 0, 15, 0, "Desarrollo MVP")
-    db.crear_metrica(p1, (date.today() - timedelta(days=20)).isoformat(), 0, 20, 0, "Lanzamiento beta")
-    db.crear_metrica(p1, (date.today() - timedelta(days=15)).isoformat(), 50, 10, 5, "Primeros 5 clientes")
-    db.crear_metrica(p1, (date.today() - timedelta(days=10)).isoformat(), 150, 8, 10, "10 clientes pagando")
-    db.crear_metrica(p1, (date.today() - timedelta(days=5)).isoformat(), 300, 5, 15, "15 clientes, boca a boca")
-    db.crear_metrica(p1, date.today().isoformat(), 500, 3, 20, "20 clientes, MRR $500")
+    db.crear_metricas_bulk([
+        (p1, ISO[25], 0, 15, 0, "Desarrollo MVP"),
+        (p1, ISO[20], 0, 20, 0, "Lanzamiento beta"),
+        (p1, ISO[15], 50, 10, 5, "Primeros 5 clientes"),
+        (p1, ISO[10], 150, 8, 10, "10 clientes pagando"),
+        (p1, ISO[5], 300, 5, 15, "15 clientes, boca a boca"),
+        (p1, ISO[0], 500, 3, 20, "20 clientes, MRR $500"),
+    ])
     
     dashboard1 = db.calcular_dashboard_proyecto(p1)
     print(f"   [OK] Ingresos: ${dashboard1['total_ingresos']:.2f}, ROI: ${dashboard1['roi']:.2f}/h")
@@ -36,14 +42,16 @@ def crear_datos_prueba():
     p2 = db.crear_proyecto(
         nombre="App Productividad",
         hipotesis="Estudiantes necesitan app de gestión de tiempo",
-        fecha_inicio=(date.today() - timedelta(days=40)).isoformat(),
+        fecha_inicio=ISO[40],
         estado="mvp"
     )
     
-    db.crear_metrica(p2, (date.today() - timedelta(days=35)).isoformat(), 0, 25, 0, "Desarrollo")
-    db.crear_metrica(p2, (date.today() - timedelta(days=30)).isoformat(), 0, 15, 0, "Testing")
-    db.crear_metrica(p2, (date.today() - timedelta(days=20)).isoformat(), 0, 10, 50, "Lanzamiento, 50 signups")
-    db.crear_metrica(p2, (date.today() - timedelta(days=10)).isoformat(), 0, 5, 5, "Solo 5 usuarios activos")
+    db.crear_metricas_bulk([
+        (p2, ISO[35], 0, 25, 0, "Desarrollo"),
+        (p2, ISO[30], 0, 15, 0, "Testing"),
+        (p2, ISO[20], 0, 10, 50, "Lanzamiento, 50 signups"),
+        (p2, ISO[10], 0, 5, 5, "Solo 5 usuarios activos"),
+    ])
     
     dashboard2 = db.calcular_dashboard_proyecto(p2)
     print(f"   [WARN] Ingresos: ${dashboard2['total_ingresos']:.2f}, ROI: ${dashboard2['roi']:.2f}/h")
@@ -53,14 +61,16 @@ def crear_datos_prueba():
     p3 = db.crear_proyecto(
         nombre="Marketplace NFT",
         hipotesis="Artistas necesitan marketplace descentralizado",
-        fecha_inicio=(date.today() - timedelta(days=50)).isoformat(),
+        fecha_inicio=ISO[50],
         estado="paused"
     )
     
-    db.crear_metrica(p3, (date.today() - timedelta(days=45)).isoformat(), 0, 40, 0, "Investigación blockchain")
-    db.crear_metrica(p3, (date.today() - timedelta(days=35)).isoformat(), 0, 30, 0, "Desarrollo smart contracts")
-    db.crear_metrica(p3, (date.today() - timedelta(days=25)).isoformat(), 0, 20, 0, "Frontend")
-    db.crear_metrica(p3, (date.today() - timedelta(days=15)).isoformat(), 0, 10, 2, "Lanzamiento, 2 usuarios")
+    db.crear_metricas_bulk([
+        (p3, ISO[45], 0, 40, 0, "Investigación blockchain"),
+        (p3, ISO[35], 0, 30, 0, "Desarrollo smart contracts"),
+        (p3, ISO[25], 0, 20, 0, "Frontend"),
+        (p3, ISO[15], 0, 10, 2, "Lanzamiento, 2 usuarios"),
+    ])
     
     dashboard3 = db.calcular_dashboard_proyecto(p3)
     print(f"   [ERROR] Ingresos: ${dashboard3['total_ingresos']:.2f}, ROI: ${dashboard3['roi']:.2f}/h")
@@ -70,7 +80,7 @@ def crear_datos_prueba():
     p4 = db.crear_proyecto(
         nombre="API Scraping",
         hipotesis="Empresas necesitan datos de competencia automatizados",
-        fecha_inicio=date.today().isoformat(),
+        fecha_inicio=ISO[0],
         estado="idea"
     )
     print(f"   [IDEA] Sin métricas aún (recién creado)")
@@ -106,20 +116,19 @@ def verificar_criterios_aceptacion():
     # Criterio 3: Dashboard carga en <100ms
     print("\n✓ Criterio 3: Performance dashboard")
     import time
-    start = time.perf_counter()
+    # Enteros en ns: sin redondeo de float al restar
+    start = time.perf_counter_ns()
     proyectos = db.obtener_todos_proyectos_con_metricas()
-    end = time.perf_counter()
-    elapsed_ms = (end - start) * 1000
+    elapsed_ms = (time.perf_counter_ns() - start) / 1e6
     print(f"  - Query dashboard: {elapsed_ms:.2f}ms")
     print(f"  - {'✓ PASS' if elapsed_ms < 100 else '✗ FAIL'} (objetivo: <100ms)")
     
     # Criterio 4: Prompt exportado en <5 segundos
     print("\n✓ Criterio 4: Exportación de prompt")
     import prompt_generator as pg
-    start = time.perf_counter()
+    start = time.perf_counter_ns()
     prompt = pg.generar_prompt_analisis()
-    end = time.perf_counter()
-    elapsed_s = end - start
+    elapsed_s = (time.perf_counter_ns() - start) / 1e9
     print(f"  - Generación de prompt: {elapsed_s:.3f}s")
     print(f"  - {'✓ PASS' if elapsed_s < 5 else '✗ FAIL'} (objetivo: <5s)")
     print(f"  - Tamaño del prompt: {len(prompt)} caracteres")
@@ -132,11 +141,12 @@ def verificar_criterios_aceptacion():
     
     # Criterio 6: Uso de memoria <128MB
     print("\n✓ Criterio 6: Eficiencia de memoria")
-    import os
-    import psutil
-    process = psutil.Process(os.getpid())
-    memory_mb = process.memory_info().rss / 1024 / 1024
-    print(f"  - Uso de memoria actual: {memory_mb:.2f} MB")
+    import sys
+    import resource  # stdlib (POSIX): sin depender de psutil
+    # ru_maxrss es el pico de RSS: KB en Linux, bytes en macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    memory_mb = max_rss / 1024 / 1024 if sys.platform == 'darwin' else max_rss / 1024
+    print(f"  - Uso de memoria (pico): {memory_mb:.2f} MB")
     print(f"  - {'✓ PASS' if memory_mb < 128 else '✗ FAIL'} (objetivo: <128MB)")
     
     print("\n" + "="*80)
@@ -155,5 +165,5 @@ if __name__ == '__main__':
     try:
         verificar_criterios_aceptacion()
     except ImportError:
-        print("\n⚠️ psutil no disponible, saltando verificación de memoria")
+        print("\n⚠️ módulo resource no disponible (Windows), saltando verificación de memoria")
         print("   (Esto es normal, no es una dependencia requerida)")
@@ -5,7 +5,10 @@ Ruta: /home/josuedgg/Documentos/Proyectos/Sistema Base/sistema_90d/validadores.p
 """
 
 from dataclasses import dataclass
-from datetime import datetime
+import re
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
 from typing import Optional
 
 @dataclass
@@ -18,10 +21,45 @@ class ErrorValidacion(Exception):
     def __str__(self):
         return f"{self.campo}: {self.mensaje} (valor recibido: {self.valor})"
 
+# Formatos de fecha aceptados: YYYY-MM-DD[(T| )HH:MM[:SS[.ffffff]]], sin zona horaria.
+# Con 'T' como separador, su orden lexicográfico es cronológico
+_ISO_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?")
+
+# Límite "ahora + 1h" como string ISO, recalculado cada 60 s
+_limite_futuro = {'ts': float('-inf'), 'iso': ''}
+
+def _limite_futuro_iso() -> str:
+    ahora = time.monotonic()
+    if ahora - _limite_futuro['ts'] >= 60:
+        # Tolerancia de 1 hora por zona horaria
+        _limite_futuro.update(ts=ahora, iso=(datetime.now() + timedelta(hours=1)).isoformat())
+    return _limite_futuro['iso']
+
+def _memoizar(func):
+    """lru_cache para validadores de un argumento; valores no hashables (listas) van sin cache."""
+    cacheada = lru_cache(maxsize=2048)(func)
+    
+    @wraps(func)
+    def envoltura(valor):
+        try:
+            hash(valor)
+        except TypeError:
+            return func(valor)
+        return cacheada(valor)
+    
+    envoltura.cache_info = cacheada.cache_info
+    envoltura.cache_clear = cacheada.cache_clear
+    return envoltura
+
 class ValidadorMetricas:
-    """Valida datos de métricas antes de insertar en DB."""
+    """
+    Valida datos de métricas antes de insertar en DB.
+    Los validadores se memoizan: solo se cachean los valores válidos (las
+    excepciones no se guardan). Una fecha válida hoy lo sigue siendo mañana.
+    """
     
     @staticmethod
+    @_memoizar
     def validar_ingresos(valor: str) -> float:
         try:
             ingresos = float(valor)
@@ -33,6 +71,7 @@ class ValidadorMetricas:
         return ingresos
     
     @staticmethod
+    @_memoizar
     def validar_tiempo(valor: str) -> float:
         try:
             horas = float(valor)
@@ -46,21 +85,24 @@ class ValidadorMetricas:
         return horas
     
     @staticmethod
+    @_memoizar
     def validar_fecha(valor: str) -> str:
+        # Forma primero (regex, barato); fromisoformat solo para validar el calendario (p. ej. 02-30)
+        if not _ISO_RE.fullmatch(valor):
+            raise ErrorValidacion(campo='fecha', valor=valor, mensaje='Formato inválido. Usa YYYY-MM-DD')
         try:
-            fecha_dt = datetime.fromisoformat(valor)
+            datetime.fromisoformat(valor)
         except ValueError:
             raise ErrorValidacion(campo='fecha', valor=valor, mensaje='Formato inválido. Usa YYYY-MM-DD')
         
-        ahora = datetime.now()
-        if fecha_dt > ahora:
-            # Tolerancia de 1 hora por zona horaria
-            if (fecha_dt - ahora).total_seconds() > 3600:
-                raise ErrorValidacion(campo='fecha', valor=valor, mensaje='No puedes registrar métricas del futuro')
+        # Comparación de strings: sin crear datetimes ni llamar a now() en cada validación
+        if valor.replace(' ', 'T', 1) > _limite_futuro_iso():
+            raise ErrorValidacion(campo='fecha', valor=valor, mensaje='No puedes registrar métricas del futuro')
         
         return valor
 
     @staticmethod
+    @_memoizar
     def validar_conversiones(valor: str) -> int:
         try:
             conversiones = int(valor)